@@ -0,0 +1,126 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Optional compiled versions of the text scanners used by `app.llm`.
+
+Build in place with `cythonize -i app/_fast.pyx`. When the extension is not
+built, `app.llm` falls back to the equivalent pure-Python implementations.
+"""
+
+cdef tuple _CHAIN_TAGS = ("think", "reasoning", "thought")
+
+
+cdef bint _match_ci(unicode text, Py_ssize_t pos, unicode word):
+    # `word` is expected in lower case.
+    cdef Py_ssize_t i
+    cdef Py_ssize_t size = len(word)
+    if pos + size > len(text):
+        return False
+    for i in range(size):
+        if text[pos + i].lower() != word[i]:
+            return False
+    return True
+
+
+cdef object _tag_at(unicode text, Py_ssize_t pos):
+    # Return the chain tag opened at `pos` (just after '<'), or None.
+    cdef unicode tag
+    cdef Py_ssize_t end
+    for tag in _CHAIN_TAGS:
+        end = pos + len(tag)
+        if end < len(text) and text[end] == u">" and _match_ci(text, pos, tag):
+            return tag
+    return None
+
+
+cdef Py_ssize_t _find_close(unicode text, unicode tag, Py_ssize_t start):
+    cdef Py_ssize_t pos
+    cdef Py_ssize_t size = len(tag)
+    cdef Py_ssize_t limit = len(text) - size - 3
+    for pos in range(start, limit + 1):
+        if (
+            text[pos] == u"<"
+            and text[pos + 1] == u"/"
+            and text[pos + size + 2] == u">"
+            and _match_ci(text, pos + 2, tag)
+        ):
+            return pos
+    return -1
+
+
+cpdef tuple scan_chain(unicode text):
+    """
+    Remove `<think>`, `<reasoning>`, and `<thought>` blocks from `text`.
+
+    Returns the remaining text and the stripped (non-empty) block contents.
+    """
+    cdef list out = []
+    cdef list snippets = []
+    cdef Py_ssize_t size = len(text)
+    cdef Py_ssize_t cursor = 0
+    cdef Py_ssize_t pos = 0
+    cdef Py_ssize_t body_start
+    cdef Py_ssize_t close
+    cdef object tag
+    cdef unicode snippet
+    while pos < size:
+        if text[pos] != u"<":
+            pos += 1
+            continue
+        tag = _tag_at(text, pos + 1)
+        if tag is not None:
+            body_start = pos + len(<unicode>tag) + 2
+            close = _find_close(text, <unicode>tag, body_start)
+            if close != -1:
+                out.append(text[cursor:pos])
+                snippet = text[body_start:close].strip()
+                if snippet:
+                    snippets.append(snippet)
+                cursor = close + len(<unicode>tag) + 3
+                pos = cursor
+                continue
+        pos += 1
+    if not cursor:
+        return text, snippets
+    out.append(text[cursor:])
+    return "".join(out), snippets
+
+
+cdef inline bint _is_line_break(Py_UCS4 ch):
+    # The boundaries recognised by `str.splitlines()`.
+    return (
+        ch == u"\n" or ch == u"\r" or ch == u"\x0b" or ch == u"\x0c"
+        or ch == u"\x1c" or ch == u"\x1d" or ch == u"\x1e" or ch == u"\x85"
+        or ch == u"\u2028" or ch == u"\u2029"
+    )
+
+
+cpdef object find_field(unicode source, unicode field):
+    """
+    Return the value of the first line starting with `field` (case-insensitive).
+
+    Lines are split where `str.splitlines()` would split them.
+    """
+    cdef unicode needle = field.lower()
+    cdef Py_ssize_t size = len(source)
+    cdef Py_ssize_t pos = 0
+    cdef Py_ssize_t line_end
+    cdef Py_ssize_t next_pos
+    cdef Py_ssize_t colon
+    while pos <= size:
+        line_end = pos
+        while line_end < size and not _is_line_break(source[line_end]):
+            line_end += 1
+        next_pos = line_end + 1
+        if (
+            next_pos < size
+            and source[line_end] == u"\r"
+            and source[next_pos] == u"\n"
+        ):
+            next_pos += 1
+        if _match_ci(source, pos, needle):
+            colon = source.find(u":", pos, line_end)
+            if colon == -1:
+                return source[pos:line_end].strip()
+            return source[colon + 1:line_end].strip()
+        pos = next_pos
+    return None
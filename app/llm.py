@@ -1,18 +1,134 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
 import json
 import re
+import sys
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
-import requests
+try:
+    import fastjsonschema
+except ImportError:  # pragma: no cover - optional dependency
+    fastjsonschema = None  # type: ignore[assignment]
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore[assignment]
+
+
+# `requests` (and urllib3, idna, certifi, ...) is only needed once a client is
+# constructed, so it is imported on first use rather than with this module.
+requests: Any = None
+
+
+def _load_requests() -> Any:
+    global requests
+    if requests is None:
+        import requests as module
+
+        requests = module
+    return requests
+
+
+# Base URLs with this scheme reach a co-located llama.cpp server over a Unix
+# domain socket, e.g. `http+unix://%2Frun%2Fllama.sock/v1/chat/completions`
+# (the socket path is the percent-encoded host).
+UNIX_SOCKET_SCHEME = "http+unix"
+
+
+@lru_cache(maxsize=None)
+def _unix_socket_adapter_class() -> Any:
+    """
+    Build the requests adapter for `http+unix://` URLs on first use.
+    """
+    import socket
+    from urllib.parse import unquote, urlsplit
+
+    http = _load_requests()
+    import urllib3  # installed alongside requests
+
+    class UnixSocketConnection(urllib3.connection.HTTPConnection):
+        def __init__(self, *args: Any, socket_path: str, **kwargs: Any) -> None:
+            super().__init__(*args, **kwargs)
+            self.socket_path = socket_path
+
+        def _new_conn(self) -> socket.socket:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            if isinstance(self.timeout, (int, float)):
+                sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            return sock
+
+    class UnixSocketConnectionPool(urllib3.HTTPConnectionPool):
+        ConnectionCls = UnixSocketConnection
+
+    class UnixSocketAdapter(http.adapters.HTTPAdapter):
+        def __init__(self, **kwargs: Any) -> None:
+            super().__init__(**kwargs)
+            self._unix_pools: Dict[str, Any] = {}
+
+        def _unix_pool(self, url: str) -> Any:
+            socket_path = unquote(urlsplit(url).netloc)
+            pool = self._unix_pools.get(socket_path)
+            if pool is None:
+                pool = UnixSocketConnectionPool(
+                    "localhost",
+                    maxsize=self._pool_maxsize,
+                    block=self._pool_block,
+                    socket_path=socket_path,
+                )
+                self._unix_pools[socket_path] = pool
+            return pool
+
+        def get_connection_with_tls_context(
+            self, request: Any, verify: Any, proxies: Any = None, cert: Any = None
+        ) -> Any:
+            return self._unix_pool(request.url)
+
+        def get_connection(self, url: str, proxies: Any = None) -> Any:
+            return self._unix_pool(url)
+
+        def close(self) -> None:
+            super().close()
+            for pool in self._unix_pools.values():
+                pool.close()
+            self._unix_pools.clear()
+
+    return UnixSocketAdapter
+
+
+def mount_unix_socket_adapter(session: Any, **adapter_kwargs: Any) -> None:
+    """
+    Let `session` (a `requests.Session`) reach `http+unix://` URLs.
+    """
+    session.mount(
+        UNIX_SOCKET_SCHEME + "://", _unix_socket_adapter_class()(**adapter_kwargs)
+    )
+
+
+def _health_url(base_url: str) -> str:
+    from urllib.parse import urlsplit, urlunsplit
+
+    parsed = urlsplit(base_url)
+    return urlunsplit((parsed.scheme, parsed.netloc, "/health", "", ""))
+
+
+# Chain-of-thought wrappers stripped from assistant text, keyed by the first
+# five characters of the tag name so the scanner needs a single dict lookup.
+_CHAIN_TAGS = {"think": "think", "reaso": "reasoning", "thoug": "thought"}
 
 
 class LlamaCppError(RuntimeError):
     """Raised when the llama.cpp backend returns an error or malformed response."""
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ToolDefinition:
     name: str
     description: str
@@ -37,6 +153,12 @@ class ToolRegistry:
 
     def __init__(self) -> None:
         self._tools: Dict[str, ToolDefinition] = {}
+        self._schemas: List[Dict[str, Any]] = []
+        # name -> (validator, handler); the only lookup `execute` needs.
+        self._dispatch: Dict[
+            str,
+            Tuple[Callable[[Dict[str, Any]], Any], Callable[[Dict[str, Any]], Any]],
+        ] = {}
 
     def register(
         self,
@@ -45,20 +167,31 @@ class ToolRegistry:
         parameters: Dict[str, Any],
         handler: Callable[[Dict[str, Any]], Any],
     ) -> None:
+        name = sys.intern(name)
         self._tools[name] = ToolDefinition(
             name=name,
             description=description,
             parameters=parameters,
             handler=handler,
         )
+        # Tool metadata is fixed once registered, so build the schemas here
+        # rather than on every chat request.
+        self._schemas = [tool.to_schema() for tool in self._tools.values()]
+        self._dispatch[name] = (_compile_validator(name, parameters), handler)
 
     def definitions(self) -> List[Dict[str, Any]]:
-        return [tool.to_schema() for tool in self._tools.values()]
+        """
+        Return the cached tool schemas. The list is shared; do not mutate it.
+        """
+        return self._schemas
 
     def execute(self, name: str, arguments: Dict[str, Any]) -> Any:
-        if name not in self._tools:
+        entry = self._dispatch.get(name)
+        if entry is None:
             raise LlamaCppError(f"Tool '{name}' is not registered.")
-        return self._tools[name].handler(arguments)
+        validate, handler = entry
+        validate(arguments)
+        return handler(arguments)
 
     def has_tool(self, name: str) -> bool:
         return name in self._tools
@@ -67,14 +200,91 @@ class ToolRegistry:
         return len(self._tools)
 
 
+def _compile_validator(
+    name: str, parameters: Dict[str, Any]
+) -> Callable[[Dict[str, Any]], Any]:
+    """
+    Build an argument validator for a tool's JSON schema.
+
+    Uses `fastjsonschema` when installed; otherwise only the top-level object
+    type and `required` keys are checked.
+    """
+    if fastjsonschema is not None:
+        compiled = fastjsonschema.compile(parameters)
+
+        def validate(arguments: Dict[str, Any]) -> Any:
+            try:
+                return compiled(arguments)
+            except fastjsonschema.JsonSchemaException as exc:
+                raise LlamaCppError(
+                    f"Invalid arguments for tool '{name}': {exc.message}"
+                ) from exc
+
+        return validate
+
+    required = tuple(parameters.get("required") or ())
+
+    def validate_required(arguments: Dict[str, Any]) -> Any:
+        if not isinstance(arguments, dict):
+            raise LlamaCppError(f"Invalid arguments for tool '{name}': expected an object.")
+        missing = [key for key in required if key not in arguments]
+        if missing:
+            raise LlamaCppError(
+                f"Invalid arguments for tool '{name}': missing {', '.join(missing)}."
+            )
+        return arguments
+
+    return validate_required
+
+
 class LlamaCppClient:
     """
     Minimal HTTP client for llama.cpp's OpenAI-compatible chat endpoint.
+
+    A single pooled session is kept per client so consecutive calls reuse the
+    same keep-alive connection instead of reconnecting for every request.
     """
 
-    def __init__(self, base_url: str, api_key: str = "") -> None:
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str = "",
+        *,
+        pool_connections: int = 16,
+        pool_maxsize: int = 64,
+    ) -> None:
         self.base_url = base_url
         self.api_key = api_key
+        http = _load_requests()
+        self._session = http.Session()
+        adapter = http.adapters.HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=0,
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        if base_url.startswith(UNIX_SOCKET_SCHEME + "://"):
+            mount_unix_socket_adapter(
+                self._session, pool_maxsize=pool_maxsize, max_retries=0
+            )
+        self._session.headers["Content-Type"] = "application/json"
+        if api_key:
+            self._session.headers["Authorization"] = f"Bearer {api_key}"
+
+    def close(self) -> None:
+        self._session.close()
+
+    def pre_warm(self) -> None:
+        """
+        Open a pooled connection with `GET /health` so the first chat call
+        does not pay for connection setup. Failures are ignored here; the
+        real request reports them.
+        """
+        try:
+            self._session.get(_health_url(self.base_url), timeout=3).close()
+        except requests.RequestException:
+            pass
 
     def chat(
         self,
@@ -86,147 +296,317 @@ class LlamaCppClient:
         tool_choice: Optional[str] = None,
         max_tokens: Optional[int] = None,
     ) -> Dict[str, Any]:
-        payload: Dict[str, Any] = {
-            "model": model,
-            "messages": messages,
-            "temperature": temperature,
-            "stream": False,
-        }
-        if tools:
-            payload["tools"] = tools
-        if tool_choice:
-            payload["tool_choice"] = tool_choice
-        if max_tokens:
-            payload["max_tokens"] = max_tokens
-
-        headers = {"Content-Type": "application/json"}
-        if self.api_key:
-            headers["Authorization"] = f"Bearer {self.api_key}"
-
-        response = requests.post(
+        payload = _build_chat_payload(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            tools=tools,
+            tool_choice=tool_choice,
+            max_tokens=max_tokens,
+        )
+        # Serialise once to bytes so requests sends the buffer as-is instead
+        # of re-encoding a str body.
+        body = _encode_payload(payload)
+        response = self._session.post(
             self.base_url,
-            headers=headers,
-            data=json.dumps(payload),
+            data=body,
+            headers={"Content-Length": str(len(body))},
             timeout=120,
         )
-        if response.status_code >= 400:
-            raise LlamaCppError(
-                f"Llama.cpp returned {response.status_code}: {response.text}"
-            )
+        return _decode_response(response)
+
+
+def _build_chat_payload(
+    *,
+    model: str,
+    messages: List[Dict[str, Any]],
+    temperature: float,
+    tools: Optional[List[Dict[str, Any]]],
+    tool_choice: Optional[str],
+    max_tokens: Optional[int],
+) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "stream": False,
+    }
+    if tools:
+        payload["tools"] = tools
+    if tool_choice:
+        payload["tool_choice"] = tool_choice
+    if max_tokens:
+        payload["max_tokens"] = max_tokens
+    return payload
+
+
+def _encode_payload(payload: Dict[str, Any]) -> bytes:
+    if orjson is not None:
         try:
-            return response.json()
-        except json.JSONDecodeError as exc:  # pragma: no cover - defensive
-            raise LlamaCppError("Failed to decode llama.cpp response as JSON.") from exc
+            return orjson.dumps(payload)
+        except TypeError:
+            # e.g. non-string keys or oversized ints; let the stdlib handle them.
+            pass
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
 
 
-def unpack_assistant_message(message: Dict[str, Any]) -> Tuple[str, List[str], List[str]]:
+def _dump_text(value: Any) -> str:
+    if orjson is not None:
+        try:
+            return orjson.dumps(value).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _decode_response(response: Any) -> Dict[str, Any]:
+    if response.status_code >= 400:
+        raise LlamaCppError(
+            f"Llama.cpp returned {response.status_code}: {response.text}"
+        )
+    try:
+        if orjson is not None:
+            return orjson.loads(response.content)
+        return response.json()
+    except ValueError as exc:  # pragma: no cover - defensive
+        raise LlamaCppError("Failed to decode llama.cpp response as JSON.") from exc
+
+
+def _find_closing_tag(text: str, tag: str, start: int) -> int:
     """
-    Normalise assistant payloads into readable text, reasoning snippets, and
-    structured reasoning content emitted by llama.cpp.
+    Case-insensitive search for `</tag>` from `start`; returns its index or -1.
     """
-    reasoning_segments: List[str] = []
-    text_segments: List[str] = []
+    needle = tag + ">"
+    size = len(needle)
+    pos = text.find("</", start)
+    while pos != -1:
+        if text[pos + 2 : pos + 2 + size].lower() == needle:
+            return pos
+        pos = text.find("</", pos + 2)
+    return -1
 
-    chain_pattern = re.compile(r"<(think|reasoning|thought)>(.*?)</\\1>", re.IGNORECASE | re.DOTALL)
 
-    def strip_chain_markup(text: str) -> str:
-        if not text:
-            return ""
+def _py_scan_chain(text: str) -> Tuple[str, List[str]]:
+    """
+    Remove `<think>`, `<reasoning>`, and `<thought>` blocks from `text`.
 
-        def _capture(match: re.Match[str]) -> str:
-            snippet = (match.group(2) or "").strip()
-            if snippet:
-                reasoning_segments.append(snippet)
-            return ""
+    Returns the remaining text and the stripped (non-empty) block contents.
+    Unterminated tags are left in place.
+    """
+    out: List[str] = []
+    snippets: List[str] = []
+    cursor = 0
+    pos = text.find("<")
+    while pos != -1:
+        tag = _CHAIN_TAGS.get(text[pos + 1 : pos + 6].lower())
+        body_start = pos + len(tag) + 2 if tag else 0
+        if tag and text[pos + 1 : body_start].lower() == tag + ">":
+            close = _find_closing_tag(text, tag, body_start)
+            if close != -1:
+                out.append(text[cursor:pos])
+                snippet = text[body_start:close].strip()
+                if snippet:
+                    snippets.append(snippet)
+                cursor = close + len(tag) + 3
+                pos = text.find("<", cursor)
+                continue
+        pos = text.find("<", pos + 1)
+    if not cursor:
+        return text, snippets
+    out.append(text[cursor:])
+    return "".join(out), snippets
 
-        cleaned = chain_pattern.sub(_capture, text)
-        return cleaned
 
-    def append_reasoning(value: Any) -> None:
-        if value is None:
-            return
-        if isinstance(value, str):
-            cleaned = value.strip()
+def _collect_reasoning(value: Any, append: Callable[[str], None]) -> None:
+    """
+    Flatten nested reasoning payloads (strings, dicts, lists) into `append`.
+    """
+    stack = [value]
+    pop = stack.pop
+    while stack:
+        item = pop()
+        if item is None:
+            continue
+        if isinstance(item, str):
+            cleaned = item.strip()
             if cleaned:
-                reasoning_segments.append(cleaned)
-            return
-        if isinstance(value, dict):
-            append_reasoning(value.get("text") or value.get("content"))
-            return
-        if isinstance(value, list):
-            for item in value:
-                append_reasoning(item)
-            return
-        reasoning_segments.append(str(value))
+                append(cleaned)
+        elif isinstance(item, dict):
+            stack.append(item.get("text") or item.get("content"))
+        elif isinstance(item, list):
+            stack.extend(reversed(item))
+        else:
+            append(str(item))
+
+
+def _normalise_reasoning_content(value: Any) -> List[str]:
+    normalised: List[str] = []
+    append = normalised.append
+    stack = [value]
+    pop = stack.pop
+    while stack:
+        item = pop()
+        if item is None:
+            continue
+        if isinstance(item, str):
+            text = item.strip()
+            if text:
+                append(text)
+        elif isinstance(item, dict):
+            for key in ("text", "content", "message"):
+                if key in item:
+                    stack.append(item[key])
+                    break
+            else:
+                try:
+                    append(json.dumps(item, ensure_ascii=False))
+                except TypeError:
+                    append(str(item))
+        elif isinstance(item, list):
+            stack.extend(reversed(item))
+        else:
+            append(str(item))
+    return [entry for entry in normalised if entry.strip()]
+
+
+def _append_text(
+    text: str, text_segments: List[str], reasoning_segments: List[str]
+) -> None:
+    if not text:
+        return
+    # Cheap early reject: no tag can be present without an opening bracket.
+    if "<" in text:
+        text, snippets = _scan_chain(text)
+        reasoning_segments.extend(snippets)
+    cleaned = text.strip()
+    if cleaned:
+        text_segments.append(cleaned)
+
+
+def _handle_text_block(
+    block: Dict[str, Any], text_segments: List[str], reasoning_segments: List[str]
+) -> None:
+    _append_text(block.get("text", ""), text_segments, reasoning_segments)
+
+
+def _handle_reasoning_block(
+    block: Dict[str, Any], text_segments: List[str], reasoning_segments: List[str]
+) -> None:
+    _collect_reasoning(block.get("text") or block.get("content"), reasoning_segments.append)
+
+
+def _skip_block(
+    block: Dict[str, Any], text_segments: List[str], reasoning_segments: List[str]
+) -> None:
+    # tool calls are handled separately by the worker
+    return None
+
+
+def _handle_unknown_block(
+    block: Dict[str, Any], text_segments: List[str], reasoning_segments: List[str]
+) -> None:
+    # Shown verbatim: scanning serialised JSON for chain tags would only
+    # corrupt the structure it is meant to display.
+    text_segments.append(_dump_text(block))
+
+
+_BLOCK_HANDLERS: Dict[Any, Callable[[Dict[str, Any], List[str], List[str]], None]] = {
+    "text": _handle_text_block,
+    "reasoning": _handle_reasoning_block,
+    "analysis": _handle_reasoning_block,
+    "tool_call": _skip_block,
+}
+
 
+# The line boundaries recognised by `str.splitlines()`.
+_LINE_BREAK_RE = re.compile(r"\r\n|[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+
+
+@lru_cache(maxsize=256)
+def _field_needle(field: str) -> str:
+    # Tools tend to ask for the same handful of field names repeatedly.
+    return field.lower()
+
+
+def _py_find_field(source: str, field: str) -> Optional[str]:
+    """
+    Return the value of the first line starting with `field` (case-insensitive).
+
+    The value is the text after the first colon, or the whole line if it has none.
+    Lines are split where `str.splitlines()` would split them.
+    """
+    # Walk line starts in the original buffer and only lower-case the
+    # prefix being compared, instead of materialising every line.
+    needle = _field_needle(field)
+    size = len(needle)
+    pos = 0
+    end_of_source = len(source)
+    while pos <= end_of_source:
+        line_break = _LINE_BREAK_RE.search(source, pos)
+        if line_break is None:
+            line_end = end_of_source
+            next_pos = end_of_source + 1
+        else:
+            line_end, next_pos = line_break.span()
+        if source[pos : pos + size].lower() == needle:
+            colon = source.find(":", pos, line_end)
+            start = colon + 1 if colon != -1 else pos
+            return source[start:line_end].strip()
+        pos = next_pos
+    return None
+
+
+try:
+    # Optional compiled scanners; see app/_fast.pyx.
+    from ._fast import find_field as _find_field, scan_chain as _scan_chain
+except ImportError:
+    _find_field = _py_find_field
+    _scan_chain = _py_scan_chain
+
+
+def _unpack_plain(content: str) -> Tuple[str, List[str], List[str]]:
+    if "<" not in content:
+        return content.strip(), [], []
+    cleaned, snippets = _scan_chain(content)
+    return cleaned.strip(), snippets, []
+
+
+def unpack_assistant_message(message: Dict[str, Any]) -> Tuple[str, List[str], List[str]]:
+    """
+    Normalise assistant payloads into readable text, reasoning snippets, and
+    structured reasoning content emitted by llama.cpp.
+    """
     content = message.get("content")
+    if (
+        isinstance(content, str)
+        and message.get("reasoning") is None
+        and message.get("reasoning_content") is None
+    ):
+        # Common case: a single text reply without structured reasoning.
+        return _unpack_plain(content)
+
+    reasoning_segments: List[str] = []
+    text_segments: List[str] = []
+
     if isinstance(content, list):
+        handlers = _BLOCK_HANDLERS
         for block in content:
             if not isinstance(block, dict):
-                cleaned = strip_chain_markup(str(block))
-                if cleaned.strip():
-                    text_segments.append(cleaned.strip())
+                _append_text(str(block), text_segments, reasoning_segments)
                 continue
-            block_type = block.get("type")
-            if block_type in {"reasoning", "analysis"}:
-                append_reasoning(block.get("text") or block.get("content"))
-            elif block_type == "text":
-                cleaned = strip_chain_markup(block.get("text", ""))
-                if cleaned.strip():
-                    text_segments.append(cleaned.strip())
-            elif block_type == "tool_call":
-                # tool calls are handled separately by the worker
-                continue
-            else:
-                cleaned = strip_chain_markup(json.dumps(block))
-                if cleaned.strip():
-                    text_segments.append(cleaned.strip())
+            handler = handlers.get(block.get("type"), _handle_unknown_block)
+            handler(block, text_segments, reasoning_segments)
     elif isinstance(content, str):
-        cleaned = strip_chain_markup(content)
-        if cleaned.strip():
-            text_segments.append(cleaned.strip())
+        _append_text(content, text_segments, reasoning_segments)
     elif content is None:
         pass
     else:
-        cleaned = strip_chain_markup(json.dumps(content))
-        if cleaned.strip():
-            text_segments.append(cleaned.strip())
+        text_segments.append(_dump_text(content))
 
     # Some llama.cpp variants return a dedicated 'reasoning' field.
-    reasoning_field = message.get("reasoning")
-    append_reasoning(reasoning_field)
-
-    def normalise_reasoning_content(value: Any) -> List[str]:
-        normalised: List[str] = []
-
-        def _collect(item: Any) -> None:
-            if item is None:
-                return
-            if isinstance(item, str):
-                text = item.strip()
-                if text:
-                    normalised.append(text)
-                return
-            if isinstance(item, dict):
-                for key in ("text", "content", "message"):
-                    if key in item:
-                        _collect(item[key])
-                        return
-                try:
-                    normalised.append(json.dumps(item, ensure_ascii=False))
-                except TypeError:
-                    normalised.append(str(item))
-                return
-            if isinstance(item, list):
-                for sub in item:
-                    _collect(sub)
-                return
-            normalised.append(str(item))
-
-        _collect(value)
-        return [entry for entry in normalised if entry.strip()]
+    _collect_reasoning(message.get("reasoning"), reasoning_segments.append)
 
-    reasoning_content = normalise_reasoning_content(message.get("reasoning_content"))
+    reasoning_content = _normalise_reasoning_content(message.get("reasoning_content"))
 
     text = "\n".join(segment for segment in text_segments if segment)
     reasoning_output = [segment.strip() for segment in reasoning_segments if segment and segment.strip()]
@@ -255,12 +635,7 @@ def register_default_tools(registry: ToolRegistry) -> None:
             raise LlamaCppError("extract_field expects a string 'source'.")
         if not field:
             raise LlamaCppError("extract_field requires the 'field' argument.")
-        result = {}
-        for line in source.splitlines():
-            if line.lower().startswith(str(field).lower()):
-                result[field] = line.split(":", 1)[-1].strip()
-                break
-        return result or {field: None}
+        return {field: _find_field(source, str(field))}
 
     registry.register(
         name="extract_field",
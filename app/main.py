@@ -2,25 +2,39 @@ from __future__ import annotations
 
 import asyncio
 import contextlib
+import hashlib
+import heapq
+import importlib.util
 import logging
+import os
+import queue
 import re
-from logging.handlers import RotatingFileHandler
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from operator import attrgetter, itemgetter
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
 from urllib.parse import parse_qs, urlparse, urlunparse
 import time
 
 from fastapi import FastAPI, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
 import requests
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore[assignment]
+
 from .settings import DEFAULT_SETTINGS, SettingsManager
-from .storage import ConversationStore, IndexStore, build_title
+from .storage import ConversationMetadata, ConversationStore, IndexStore, build_title
 from .tasks import IdleMonitor, TaskService
 from .templates import (
     render_conversation_list,
     render_conversation_messages,
-    render_dashboard,
+    iter_dashboard,
     render_task_strip,
     render_settings_page,
     render_help_page,
@@ -33,6 +47,41 @@ LOG_FILE = DATA_DIR / "server.log"
 SETTINGS_PATH = DATA_DIR / "settings.json"
 
 
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse that serialises with orjson when it is installed.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            try:
+                return orjson.dumps(content)
+            except TypeError:
+                pass
+        return super().render(content)
+
+
+class _LogListener(QueueListener):
+    """
+    QueueListener that tracks whether its thread is running, so it can be
+    stopped more than once (around fork and at shutdown).
+    """
+
+    running = False
+
+    def start(self) -> None:
+        super().start()
+        self.running = True
+
+    def stop(self) -> None:
+        if self.running:
+            super().stop()
+            self.running = False
+
+
+log_listener: Optional[_LogListener] = None
+
+
 def _configure_logging() -> logging.Logger:
     logger = logging.getLogger("webui")
     if logger.handlers:
@@ -48,79 +97,125 @@ def _configure_logging() -> logging.Logger:
     file_handler.setFormatter(formatter)
     stream_handler = logging.StreamHandler()
     stream_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-    logger.addHandler(stream_handler)
+    # Request handlers only enqueue records; file and console I/O (including
+    # rollover) happen on the listener thread.
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    global log_listener
+    log_listener = _LogListener(
+        log_queue, file_handler, stream_handler, respect_handler_level=True
+    )
+    logger.addHandler(QueueHandler(log_queue))
     logger.propagate = False
+    log_listener.start()
+
+    # Forking while the listener thread is mid-write would leave the child
+    # holding that thread's I/O locks, so drain and stop it around fork().
+    listening = True
+
+    def pause_listener() -> None:
+        nonlocal listening
+        listening = log_listener.running
+        if listening:
+            log_listener.stop()
+
+    def resume_listener() -> None:
+        if listening:
+            log_listener.start()
+
+    def log_directly() -> None:
+        # A forked worker has no listener thread, so it writes to the handlers itself.
+        logger.handlers = [file_handler, stream_handler]
+
+    os.register_at_fork(
+        before=pause_listener,
+        after_in_parent=resume_listener,
+        after_in_child=log_directly,
+    )
     logger.debug("Logging initialised, writing to %s", LOG_FILE)
     return logger
 
 
 logger = _configure_logging()
 
-app = FastAPI()
-
 settings_manager = SettingsManager(SETTINGS_PATH)
 conversation_store = ConversationStore(DATA_DIR)
 index_store = IndexStore(DATA_DIR)
 task_service = TaskService(DATA_DIR, SETTINGS_PATH)
 idle_monitor = IdleMonitor(timeout_seconds=30)
-idle_task: Optional[asyncio.Task] = None
+
+# Shared so health probes reuse a keep-alive connection to llama.cpp.
+health_session = requests.Session()
+
+# All store work runs on the threadpool, never on the event loop, so waiting
+# for these locks only ever blocks a worker thread. The stores and the task
+# service are not thread-safe, so each has its own lock, held only while it
+# is used; rendering happens outside them. The render caches below are
+# replaced as a whole and need none. Where two are held, take them in the
+# order index, conversation, task.
+index_lock = threading.RLock()
+conversation_lock = threading.RLock()
+task_lock = threading.RLock()
+# Saves read, merge and write the settings file; concurrent ones would lose
+# each other's changes.
+settings_lock = threading.Lock()
 
 app_state: Dict[str, bool] = {"idle": False}
 llama_status: Dict[str, str] = {"state": "warn", "label": "LLM Unknown"}
 
-
-def _ensure_agents() -> List[Dict]:
-    configured = list(settings_manager.settings.get("agents", []))
-    if len(configured) >= 4:
-        agents = configured[:4]
-    else:
-        fallback = list(DEFAULT_SETTINGS["agents"])
-        combined = configured + fallback[len(configured) : 4]
-        while len(combined) < 4:
-            combined.append(
-                {
-                    "name": f"Agent {len(combined) + 1}",
-                    "description": "",
-                    "system_prompt": settings_manager.settings.get(
-                        "system_prompt", DEFAULT_SETTINGS["system_prompt"]
-                    ),
-                    "model": settings_manager.settings.get("llama_cpp", {}).get(
-                        "model", DEFAULT_SETTINGS["llama_cpp"]["model"]
-                    ),
-                    "temperature": DEFAULT_SETTINGS["agents"][0]["temperature"],
-                    "context_size": DEFAULT_SETTINGS["agents"][0]["context_size"],
-                }
-            )
-        agents = combined[:4]
-    alias_counts: Dict[str, int] = {}
-    default_prompt = settings_manager.settings.get(
-        "system_prompt", DEFAULT_SETTINGS["system_prompt"]
-    )
-    default_model = settings_manager.settings.get("llama_cpp", {}).get(
-        "model", DEFAULT_SETTINGS["llama_cpp"]["model"]
-    )
-    default_temperature = DEFAULT_SETTINGS["agents"][0]["temperature"]
-    default_context = DEFAULT_SETTINGS["agents"][0]["context_size"]
-    for index, agent in enumerate(agents):
-        agent.setdefault("description", "")
-        agent.setdefault("system_prompt", default_prompt)
-        agent.setdefault("model", default_model)
-        agent.setdefault("temperature", default_temperature)
-        agent.setdefault("context_size", default_context)
-        alias = agent.get("alias")
-        if not alias:
-            alias = re.sub(r"[^a-z0-9]+", "-", agent["name"].lower()).strip("-")
-        if not alias:
-            alias = f"agent-{index + 1}"
-        base_alias = alias
-        counter = 1
-        while alias in alias_counts:
-            counter += 1
-            alias = f"{base_alias}-{counter}"
-        alias_counts[alias] = 1
-        agent["alias"] = alias
-    return agents[:4]
+_MENTION_RE = re.compile(r"(^|\s)@([a-z0-9][a-z0-9\-]*)", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s{2,}")
+_FORM_CONTENT_TYPES = ("application/x-www-form-urlencoded", "multipart/form-data")
+# Starlette's form parser needs python-multipart, importable under either name.
+_HAS_MULTIPART = (
+    importlib.util.find_spec("python_multipart") is not None
+    or importlib.util.find_spec("multipart") is not None
+)
+_PLACEHOLDER_COMPLETED = "<article class=\"task-card placeholder\"><p>No finished tasks.</p></article>"
+_PLACEHOLDER_QUEUED = "<article class=\"task-card placeholder\"><p>No queued tasks.</p></article>"
+
+# conversation id -> (file signature, view), least recently built first
+_conversation_views: Dict[str, Tuple[Any, Dict[str, Any]]] = {}
+_CONVERSATION_VIEW_LIMIT = 16
+# (history key, rendered sidebar html)
+_history_html_cache: Optional[Tuple[Any, str]] = None
+# ((task revision, tick), rendered task strip)
+_tasks_html_cache: Optional[Tuple[Tuple[int, int], str]] = None
+# (settings version, health url)
+_health_url_cache: Optional[Tuple[int, Optional[str]]] = None
+# (index version, conversation ids, conversation picked by _resolve_conversation)
+_default_conversation_cache: Optional[Tuple[Any, Set[str], str]] = None
+# Counters restart with the process, so ETags carry this to stay unique.
+_PROCESS_TOKEN = (os.getpid(), time.time_ns())
+_EMPTY_CONVERSATION_VIEW: Dict[str, Any] = {
+    "entries": [],
+    "entry_ids": [],
+    "last_entry_id": None,
+    "reward_map": {},
+    "tool_reward_map": {},
+}
+
+
+async def _read_form(request: Request) -> Dict[str, str]:
+    """
+    Return the submitted form fields, last value winning. Blank values are
+    dropped, matching `parse_qs`.
+
+    Starlette's streaming form parser is used when python-multipart is
+    installed and the body is declared as a form; otherwise the urlencoded
+    body is parsed directly.
+    """
+    content_type = request.headers.get("content-type", "")
+    if _HAS_MULTIPART and content_type.startswith(_FORM_CONTENT_TYPES):
+        form = await request.form()
+        return {
+            key: value
+            for key, value in form.multi_items()
+            if isinstance(value, str) and value
+        }
+    body_bytes = await request.body()
+    return {
+        key: values[-1] for key, values in parse_qs(body_bytes.decode("utf-8")).items()
+    }
 
 
 def _status_context() -> Dict[str, str]:
@@ -139,47 +234,102 @@ def _status_context() -> Dict[str, str]:
 
 
 def _schedule_missing_summaries() -> None:
-    latest_index = index_store.latest_index()
-    for meta in conversation_store.list_conversations():
-        record = latest_index.get(meta.conversation_id, {})
-        if not record.get("summary"):
-            task_service.mark_summary_needed(meta.conversation_id)
-    for conversation_id in task_service.pending_summary_ids():
-        task_service.enqueue_summary(conversation_id)
+    with index_lock:
+        latest_index = index_store.latest_index()
+    with conversation_lock:
+        conversation_metadata = conversation_store.list_conversations()
+    with task_lock:
+        for meta in conversation_metadata:
+            record = latest_index.get(meta.conversation_id, {})
+            if not record.get("summary"):
+                task_service.mark_summary_needed(meta.conversation_id)
+        for conversation_id in task_service.take_pending_summary_ids():
+            task_service.enqueue_summary(conversation_id)
 
 
 def _llama_health_url() -> Optional[str]:
-    base_url = settings_manager.settings.get("llama_cpp", {}).get("base_url")
-    if not base_url:
-        return None
-    parsed = urlparse(base_url)
-    if not parsed.scheme or not parsed.netloc:
-        return None
-    return urlunparse((parsed.scheme, parsed.netloc, "/health", "", "", ""))
-
+    global _health_url_cache
+    # Version first: a save in between then only causes a recompute.
+    version = settings_manager.version
+    settings = settings_manager.settings
+    if _health_url_cache is not None and _health_url_cache[0] == version:
+        return _health_url_cache[1]
+    health_url = None
+    base_url = settings.get("llama_cpp", {}).get("base_url")
+    if base_url:
+        parsed = urlparse(base_url)
+        if parsed.scheme and parsed.netloc:
+            health_url = urlunparse((parsed.scheme, parsed.netloc, "/health", "", "", ""))
+            if parsed.scheme == "http+unix":
+                # llm.UNIX_SOCKET_SCHEME; imported only when a socket is configured.
+                from .llm import mount_unix_socket_adapter
+
+                mount_unix_socket_adapter(health_session, max_retries=0)
+    _health_url_cache = (version, health_url)
+    return health_url
+
+
+def _default_conversation(
+    latest_index: Dict[str, Dict],
+    conversation_metadata: List[ConversationMetadata],
+    conversation_ids: Set[str],
+) -> str:
+    """
+    Pick the conversation with the latest recorded access, reusing the
+    previous pick while neither the index nor the conversation set changed.
+    """
+    global _default_conversation_cache
+    version = index_store.version
+    cached = _default_conversation_cache
+    if cached is not None and cached[0] == version and cached[1] == conversation_ids:
+        return cached[2]
+
+    def sort_key(cid: str) -> str:
+        record = latest_index.get(cid, {})
+        return record.get("last_accessed") or record.get("timestamp") or ""
 
-def _collect_view_state(
-    requested_conversation: Optional[str],
-) -> Dict[str, Any]:
-    task_service.drain_events()
-    latest_index = index_store.latest_index()
-    conversation_metadata = conversation_store.list_conversations()
-    conversation_ids = [meta.conversation_id for meta in conversation_metadata]
-    active_conversation = (
-        requested_conversation if requested_conversation in conversation_ids else None
+    active_conversation = max(
+        (meta.conversation_id for meta in conversation_metadata), key=sort_key
     )
+    _default_conversation_cache = (version, conversation_ids, active_conversation)
+    return active_conversation
 
-    if not active_conversation and conversation_ids:
-        def sort_key(cid: str) -> str:
-            record = latest_index.get(cid, {})
-            return record.get("last_accessed") or record.get("timestamp") or ""
 
-        active_conversation = max(conversation_ids, key=sort_key)
+def _resolve_conversation(
+    requested_conversation: Optional[str],
+) -> Tuple[Optional[str], Dict[str, Dict], List[ConversationMetadata]]:
+    """
+    Pick the active conversation and record the access to it.
 
-    if active_conversation:
-        index_store.record_access(active_conversation)
+    Returns it together with the index and listing it was picked from.
+    """
+    with index_lock:
         latest_index = index_store.latest_index()
+        with conversation_lock:
+            conversation_metadata = conversation_store.list_conversations()
+        conversation_ids = {meta.conversation_id for meta in conversation_metadata}
+        active_conversation = (
+            requested_conversation if requested_conversation in conversation_ids else None
+        )
+
+        if not active_conversation and conversation_ids:
+            active_conversation = _default_conversation(
+                latest_index, conversation_metadata, conversation_ids
+            )
+
+        if active_conversation:
+            index_store.record_access(active_conversation, latest_index)
+    return active_conversation, latest_index, conversation_metadata
+
 
+def _history_view(
+    active_conversation: Optional[str],
+    latest_index: Dict[str, Dict],
+    conversation_metadata: List[ConversationMetadata],
+) -> Tuple[str, List[Dict[str, str]]]:
+    """
+    Build the sidebar history and the active conversation's title.
+    """
     history: List[Dict[str, str]] = []
     active_title = ""
     for meta in conversation_metadata:
@@ -191,7 +341,7 @@ def _collect_view_state(
         last_accessed = (
             record.get("last_accessed")
             or record.get("timestamp")
-            or meta.last_modified.strftime("%Y-%m-%dT%H:%M:%S")
+            or meta.last_modified_iso
         )
         history.append(
             {
@@ -204,35 +354,49 @@ def _collect_view_state(
         if cid == active_conversation:
             active_title = title
 
-    history.sort(key=lambda item: item.get("last_accessed", ""), reverse=True)
+    history.sort(key=itemgetter("last_accessed"), reverse=True)
 
     if active_conversation and not active_title:
         active_title = f"Conversation {active_conversation[:8]}"
-
-    entries = (
-        conversation_store.load_conversation(active_conversation)
-        if active_conversation
-        else []
-    )
-    reward_map: Dict[str, int] = {}
-    tool_reward_map: Dict[str, int] = {}
-    for entry in entries:
-        if entry.get("type") == "label":
-            content = entry.get("content") or {}
-            target = content.get("target")
-            reward = content.get("reward")
-            if content.get("target_type") == "tool_call":
-                tool_reward_map[target] = reward
-            else:
-                reward_map[target] = reward
-
-    visible_entries = [entry for entry in entries if entry.get("type") != "label"]
-    entry_ids = [entry.get("id") for entry in visible_entries if entry.get("id")]
-    last_entry_id = entry_ids[-1] if entry_ids else None
-
-    status = _status_context()
-    agents = _ensure_agents()
-    tasks = task_service.snapshot()
+    return active_title, history
+
+
+def _conversation_view(conversation_id: Optional[str]) -> Dict[str, Any]:
+    """
+    Entries, reward maps, and entry ids for one conversation.
+
+    Results are reused until the conversation file changes on disk (the worker
+    appends to it from another process), so treat them as read-only.
+    """
+    if not conversation_id:
+        return _EMPTY_CONVERSATION_VIEW
+    with conversation_lock:
+        signature = conversation_store.file_signature(conversation_id)
+        cached = _conversation_views.get(conversation_id)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        entries = conversation_store.load_conversation(conversation_id)
+        reward_map, tool_reward_map = conversation_store.reward_maps(conversation_id, entries)
+        visible_entries = [entry for entry in entries if entry.get("type") != "label"]
+        entry_ids = [entry.get("id") for entry in visible_entries if entry.get("id")]
+        view = {
+            "entries": entries,
+            "entry_ids": entry_ids,
+            "last_entry_id": entry_ids[-1] if entry_ids else None,
+            "reward_map": reward_map,
+            "tool_reward_map": tool_reward_map,
+        }
+        _conversation_views.pop(conversation_id, None)
+        _conversation_views[conversation_id] = (signature, view)
+        while len(_conversation_views) > _CONVERSATION_VIEW_LIMIT:
+            del _conversation_views[next(iter(_conversation_views))]
+        return view
+
+
+def _tasks_view() -> Tuple[List[Any], List[List[Any]]]:
+    with task_lock:
+        tasks = task_service.snapshot()
     current_tick = int(time.time() // 5)
     task_signature: List[List[Any]] = []
     for task in tasks:
@@ -246,124 +410,215 @@ def _collect_view_state(
                 tick_marker,
             ]
         )
+    return tasks, task_signature
 
-    logger.debug(
-        "Collected view state for %s (history=%d entries=%d tasks=%d)",
-        active_conversation,
-        len(history),
-        len(entries),
-        len(tasks),
-    )
+
+def _collect_view_state(
+    resolved: Tuple[Optional[str], Dict[str, Dict], List[ConversationMetadata]],
+) -> Dict[str, Any]:
+    """
+    Gather everything the page shows, given `_resolve_conversation()`'s result.
+
+    Callers drain task events first.
+    """
+    active_conversation = resolved[0]
+    active_title, history = _history_view(*resolved)
+    conversation = _conversation_view(active_conversation)
+    tasks, task_signature = _tasks_view()
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Collected view state for %s (history=%d entries=%d tasks=%d)",
+            active_conversation,
+            len(history),
+            len(conversation["entries"]),
+            len(tasks),
+        )
 
     return {
         "active_conversation": active_conversation,
         "conversation_title": active_title or "Conversation",
         "history": history,
-        "entries": entries,
-        "entry_ids": entry_ids,
-        "last_entry_id": last_entry_id,
-        "reward_map": reward_map,
-        "tool_reward_map": tool_reward_map,
-        "status": status,
-        "agents": agents,
+        "entries": conversation["entries"],
+        "entry_ids": conversation["entry_ids"],
+        "last_entry_id": conversation["last_entry_id"],
+        "reward_map": conversation["reward_map"],
+        "tool_reward_map": conversation["tool_reward_map"],
+        "conversation": conversation,
+        "status": _status_context(),
+        "agents": settings_manager.agents,
         "tasks": tasks,
         "task_signature": task_signature,
     }
 
 
-def _render_tasks_html(tasks: List[Any]) -> str:
-    completed = [task for task in tasks if task.status == "completed"]
-    queued = [task for task in tasks if task.status != "completed"]
-    completed.sort(key=lambda rec: rec.updated_at, reverse=True)
-    recent_completed = completed[:2]
-    recent_completed.sort(key=lambda rec: getattr(rec, "created_at", rec.updated_at))
-    queued.sort(key=lambda rec: (rec.priority, rec.updated_at))
-    placeholder_completed = "<article class=\"task-card placeholder\"><p>No finished tasks.</p></article>"
-    placeholder_queued = "<article class=\"task-card placeholder\"><p>No queued tasks.</p></article>"
-
-    completed_html = render_task_strip(
-        recent_completed,
-        css_class="completed",
-        min_slots=2,
-        placeholder_html=placeholder_completed,
-    )
-    queued_html = render_task_strip(
-        queued,
-        css_class="queued",
-        min_slots=1,
-        placeholder_html=placeholder_queued,
+def _render_history_html(
+    history: List[Dict[str, str]], active_conversation: Optional[str]
+) -> str:
+    global _history_html_cache
+    key = (
+        active_conversation,
+        tuple(
+            (item["conversation_id"], item["title"], item["last_accessed"])
+            for item in history
+        ),
     )
+    if _history_html_cache is not None and _history_html_cache[0] == key:
+        return _history_html_cache[1]
+    html = render_conversation_list(history, active_conversation)
+    _history_html_cache = (key, html)
+    return html
+
+
+def _render_messages_html(state: Dict[str, Any]) -> str:
+    active_conversation = state["active_conversation"]
+    view = state["conversation"]
+    if not active_conversation:
+        return render_conversation_messages([], {}, {}, None)
+    # The conversation view is memoised per file signature, so the rendered
+    # messages can live alongside it.
+    html = view.get("messages_html")
+    if html is None:
+        html = render_conversation_messages(
+            view["entries"],
+            view["reward_map"],
+            view["tool_reward_map"],
+            active_conversation,
+        )
+        view["messages_html"] = html
+    return html
 
-    parts = [completed_html, "<div class=\"task-divider\"></div>", queued_html]
-    return "\n".join(parts)
 
+def _render_tasks_html(tasks: List[Any]) -> str:
+    global _tasks_html_cache
+    # Running cards show elapsed time, so renders are also keyed on the same
+    # five-second tick the task signature uses. The records are updated in
+    # place as events arrive, so render them under the lock.
+    with task_lock:
+        key = (task_service.revision, int(time.time() // 5))
+        if _tasks_html_cache is not None and _tasks_html_cache[0] == key:
+            return _tasks_html_cache[1]
+        completed: List[Any] = []
+        queued: List[Any] = []
+        for task in tasks:
+            if task.status == "completed":
+                completed.append(task)
+            else:
+                queued.append(task)
+        recent_completed = heapq.nlargest(2, completed, key=attrgetter("updated_at"))
+        recent_completed.sort(key=attrgetter("created_at"))
+        queued.sort(key=attrgetter("priority", "updated_at"))
+        completed_html = render_task_strip(
+            recent_completed,
+            css_class="completed",
+            min_slots=2,
+            placeholder_html=_PLACEHOLDER_COMPLETED,
+        )
+        queued_html = render_task_strip(
+            queued,
+            css_class="queued",
+            min_slots=1,
+            placeholder_html=_PLACEHOLDER_QUEUED,
+        )
 
-@app.on_event("startup")
-async def on_startup() -> None:
+        parts = [completed_html, "<div class=\"task-divider\"></div>", queued_html]
+        html = "\n".join(parts)
+        _tasks_html_cache = (key, html)
+        return html
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
     DATA_DIR.mkdir(parents=True, exist_ok=True)
+    # Load settings, agents and the conversation listing now so the first
+    # request does not pay for the cold reads.
+    settings_manager.settings
+    settings_manager.agents
+    index_store.latest_index()
+    conversation_store.list_conversations()
     task_service.start()
-    logger.info("Application startup complete.")
+    loop = asyncio.get_running_loop()
+    logger.info(
+        "Application startup complete (event loop: %s).",
+        type(loop).__name__,
+    )
+
+    def catch_up() -> None:
+        with task_lock:
+            task_service.drain_events(force=True)
+        _schedule_missing_summaries()
 
     def enter_idle() -> None:
         app_state["idle"] = True
-        task_service.drain_events()
-        _schedule_missing_summaries()
+        # The locks may be held by a request on the threadpool; wait for them there.
+        loop.run_in_executor(None, catch_up)
 
     def exit_idle() -> None:
         app_state["idle"] = False
 
-    global idle_task
     idle_task = asyncio.create_task(
         idle_monitor.loop(on_idle=enter_idle, on_active=exit_idle), name="idle-monitor"
     )
-
-
-@app.on_event("shutdown")
-async def on_shutdown() -> None:
-    if idle_task:
+    try:
+        yield
+    finally:
         idle_task.cancel()
         with contextlib.suppress(asyncio.CancelledError):
             await idle_task
-    task_service.stop()
-    logger.info("Application shutdown complete.")
+        task_service.stop()
+        conversation_store.close()
+        health_session.close()
+        logger.info("Application shutdown complete.")
+        if log_listener is not None:
+            log_listener.stop()
+
+
+app = FastAPI(default_response_class=FastJSONResponse, lifespan=lifespan)
+# The dashboard and /state payloads are mostly HTML and shrink several-fold.
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 
 @app.get("/", response_class=HTMLResponse)
-async def dashboard(request: Request, conversation: Optional[str] = None) -> HTMLResponse:
-    state = _collect_view_state(conversation)
-    html = render_dashboard(
-        conversations=state["history"],
+def dashboard(request: Request, conversation: Optional[str] = None) -> HTMLResponse:
+    with task_lock:
+        task_service.drain_events()
+    state = _collect_view_state(_resolve_conversation(conversation))
+    # The fragments come from the same caches /state uses, so a page load
+    # only re-renders what changed since the last poll; the page is joined
+    # around them once.
+    chunks = iter_dashboard(
+        history_html=_render_history_html(state["history"], state["active_conversation"]),
+        messages_html=_render_messages_html(state),
+        tasks_html=_render_tasks_html(state["tasks"]),
         active_conversation=state["active_conversation"],
-        conversation_entries=state["entries"],
         entry_ids=state["entry_ids"],
-        reward_map=state["reward_map"],
-        tool_reward_map=state["tool_reward_map"],
         conversation_title=state["conversation_title"],
         agents=state["agents"],
-        tasks=state["tasks"],
         status=state["status"],
         task_signature=state["task_signature"],
     )
-    return HTMLResponse(html)
+    return HTMLResponse("".join(chunks))
 
 
 @app.post("/conversation/new")
-async def new_conversation() -> RedirectResponse:
+def new_conversation() -> RedirectResponse:
     idle_monitor.touch()
-    agents = _ensure_agents()
+    agents = settings_manager.agents
     default_agent = agents[0]
-    conversation_id = conversation_store.create_conversation(
-        agent=default_agent.get("name", "General"),
-        system_prompt=default_agent.get(
-            "system_prompt", settings_manager.settings.get("system_prompt", DEFAULT_SETTINGS["system_prompt"])
-        ),
-        model=default_agent.get(
-            "model", settings_manager.settings.get("llama_cpp", {}).get("model", DEFAULT_SETTINGS["llama_cpp"]["model"])
-        ),
-        temperature=default_agent.get("temperature", 0.2),
-        context_size=default_agent.get("context_size", 4096),
-    )
-    index_store.record_access(conversation_id)
+    with conversation_lock:
+        conversation_id = conversation_store.create_conversation(
+            agent=default_agent.get("name", "General"),
+            system_prompt=default_agent.get(
+                "system_prompt", settings_manager.settings.get("system_prompt", DEFAULT_SETTINGS["system_prompt"])
+            ),
+            model=default_agent.get(
+                "model", settings_manager.settings.get("llama_cpp", {}).get("model", DEFAULT_SETTINGS["llama_cpp"]["model"])
+            ),
+            temperature=default_agent.get("temperature", 0.2),
+            context_size=default_agent.get("context_size", 4096),
+        )
+    with index_lock:
+        index_store.record_access(conversation_id)
     logger.info(
         "Started new conversation %s (agent=%s model=%s)",
         conversation_id,
@@ -383,12 +638,11 @@ async def send_message(
     idle_monitor.touch()
     accepts_json = "application/json" in (request.headers.get("accept", "").lower())
 
-    body_bytes = await request.body()
-    form_data = parse_qs(body_bytes.decode("utf-8"))
-    raw_prompt = (form_data.get("prompt") or [""])[-1]
+    form_data = await _read_form(request)
+    raw_prompt = form_data.get("prompt", "")
     if not raw_prompt or not raw_prompt.strip():
         if accepts_json:
-            return JSONResponse(
+            return FastJSONResponse(
                 {"ok": False, "error": "Prompt must not be empty."},
                 status_code=status.HTTP_400_BAD_REQUEST,
             )
@@ -396,112 +650,121 @@ async def send_message(
             url=f"/?conversation={conversation_id}",
             status_code=status.HTTP_303_SEE_OTHER,
         )
-    entries = conversation_store.load_conversation(conversation_id)
-    if not entries:
-        if accepts_json:
-            return JSONResponse(
-                {"ok": False, "error": "Conversation not found."},
-                status_code=status.HTTP_404_NOT_FOUND,
+    # Store work happens on the threadpool, where waiting for the store locks
+    # does not stall the event loop.
+    return await run_in_threadpool(_queue_user_message, conversation_id, raw_prompt, accepts_json)
+
+
+def _queue_user_message(conversation_id: str, raw_prompt: str, accepts_json: bool) -> Response:
+    with conversation_lock:
+        entries = conversation_store.load_conversation(conversation_id)
+        if not entries:
+            if accepts_json:
+                return FastJSONResponse(
+                    {"ok": False, "error": "Conversation not found."},
+                    status_code=status.HTTP_404_NOT_FOUND,
+                )
+            return RedirectResponse(
+                url=f"/?conversation={conversation_id}",
+                status_code=status.HTTP_303_SEE_OTHER,
             )
-        return RedirectResponse(
-            url=f"/?conversation={conversation_id}",
-            status_code=status.HTTP_303_SEE_OTHER,
+        agents = settings_manager.agents
+        agent_lookup = {item["name"]: item for item in agents}
+        alias_lookup = {item["alias"].lower(): item for item in agents}
+        last_metadata = next(
+            (
+                entry
+                for entry in reversed(entries)
+                if entry.get("type") == "metadata"
+            ),
+            {},
         )
-    agents = _ensure_agents()
-    agent_lookup = {item["name"]: item for item in agents}
-    alias_lookup = {item["alias"].lower(): item for item in agents}
-    last_metadata = next(
-        (
-            entry
-            for entry in reversed(entries)
-            if entry.get("type") == "metadata"
-        ),
-        {},
-    )
-    last_content = last_metadata.get("content") or {}
-    default_agent = agent_lookup.get(last_content.get("agent")) or agents[0]
-    selected = default_agent
-    system_prompt = (
-        last_content.get("system_prompt")
-        or selected.get("system_prompt")
-        or settings_manager.settings["system_prompt"]
-    )
-    model_name = (
-        last_content.get("model")
-        or selected.get("model")
-        or settings_manager.settings["llama_cpp"]["model"]
-    )
-    mention_pattern = re.compile(r"(^|\s)@([a-z0-9][a-z0-9\-]*)", re.IGNORECASE)
-    mention_match = mention_pattern.search(raw_prompt)
-    prompt_text = raw_prompt.strip()
-    if mention_match:
-        mention_name = mention_match.group(2).strip().lower()
-        mentioned_agent = alias_lookup.get(mention_name)
-        if mentioned_agent:
-            selected = mentioned_agent
-            system_prompt = (
-                selected.get("system_prompt") or settings_manager.settings["system_prompt"]
-            )
-            model_name = selected.get("model") or settings_manager.settings["llama_cpp"]["model"]
-            before = raw_prompt[: mention_match.start()]
-            after = raw_prompt[mention_match.end() :]
-            replacement = mention_match.group(1) if mention_match.group(1) else ""
-            prompt_text = (before + replacement + after)
-            prompt_text = re.sub(r"\s{2,}", " ", prompt_text).strip()
-        else:
-            prompt_text = raw_prompt.strip()
-    if not prompt_text:
-        if accepts_json:
-            return JSONResponse(
-                {"ok": False, "error": "Prompt must not be empty."},
-                status_code=status.HTTP_400_BAD_REQUEST,
+        last_content = last_metadata.get("content") or {}
+        default_agent = agent_lookup.get(last_content.get("agent")) or agents[0]
+        selected = default_agent
+        system_prompt = (
+            last_content.get("system_prompt")
+            or selected.get("system_prompt")
+            or settings_manager.settings["system_prompt"]
+        )
+        model_name = (
+            last_content.get("model")
+            or selected.get("model")
+            or settings_manager.settings["llama_cpp"]["model"]
+        )
+        mention_match = _MENTION_RE.search(raw_prompt)
+        prompt_text = raw_prompt.strip()
+        if mention_match:
+            mention_name = mention_match.group(2).strip().lower()
+            mentioned_agent = alias_lookup.get(mention_name)
+            if mentioned_agent:
+                selected = mentioned_agent
+                system_prompt = (
+                    selected.get("system_prompt") or settings_manager.settings["system_prompt"]
+                )
+                model_name = selected.get("model") or settings_manager.settings["llama_cpp"]["model"]
+                before = raw_prompt[: mention_match.start()]
+                after = raw_prompt[mention_match.end() :]
+                replacement = mention_match.group(1) if mention_match.group(1) else ""
+                prompt_text = (before + replacement + after)
+                prompt_text = _WHITESPACE_RE.sub(" ", prompt_text).strip()
+            else:
+                prompt_text = raw_prompt.strip()
+        if not prompt_text:
+            if accepts_json:
+                return FastJSONResponse(
+                    {"ok": False, "error": "Prompt must not be empty."},
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                )
+            return RedirectResponse(
+                url=f"/?conversation={conversation_id}",
+                status_code=status.HTTP_303_SEE_OTHER,
             )
-        return RedirectResponse(
-            url=f"/?conversation={conversation_id}",
-            status_code=status.HTTP_303_SEE_OTHER,
+        selected_temp = selected.get("temperature", 0.2)
+        selected_ctx = selected.get("context_size", 4096)
+        with conversation_store.batch(conversation_id):
+            if (
+                last_content.get("system_prompt") != system_prompt
+                or last_content.get("agent") != selected.get("name")
+                or last_content.get("model") != model_name
+                or last_content.get("temperature") != selected_temp
+                or last_content.get("context_size") != selected_ctx
+            ):
+                conversation_store.append_entry(
+                    conversation_id,
+                    {
+                        "role": "system",
+                        "type": "metadata",
+                        "content": {
+                            "system_prompt": system_prompt,
+                            "agent": selected.get("name"),
+                            "model": model_name,
+                            "temperature": selected_temp,
+                            "context_size": selected_ctx,
+                        },
+                        "ordering": conversation_store.new_ordering(conversation_id, "system"),
+                        "tags": [],
+                    },
+                    owned=True,
+                )
+            conversation_store.append_user_message(conversation_id, prompt_text)
+        logger.info(
+            "Queued user message for %s (agent=%s model=%s)",
+            conversation_id,
+            selected.get("name"),
+            model_name,
         )
-    selected_temp = selected.get("temperature", 0.2)
-    selected_ctx = selected.get("context_size", 4096)
-    if (
-        last_content.get("system_prompt") != system_prompt
-        or last_content.get("agent") != selected.get("name")
-        or last_content.get("model") != model_name
-        or last_content.get("temperature") != selected_temp
-        or last_content.get("context_size") != selected_ctx
-    ):
-        conversation_store.append_entry(
+    with task_lock:
+        task_service.mark_summary_needed(conversation_id)
+        task_service.enqueue_completion(
             conversation_id,
-            {
-                "role": "system",
-                "type": "metadata",
-                "content": {
-                    "system_prompt": system_prompt,
-                    "agent": selected.get("name"),
-                    "model": model_name,
-                    "temperature": selected_temp,
-                    "context_size": selected_ctx,
-                },
-                "ordering": conversation_store.new_ordering(conversation_id, "system"),
-                "tags": [],
-            },
+            selected.get("name"),
+            model_name,
+            temperature=selected_temp,
+            context_size=selected_ctx,
         )
-    conversation_store.append_user_message(conversation_id, prompt_text)
-    logger.info(
-        "Queued user message for %s (agent=%s model=%s)",
-        conversation_id,
-        selected.get("name"),
-        model_name,
-    )
-    task_service.mark_summary_needed(conversation_id)
-    task_service.enqueue_completion(
-        conversation_id,
-        selected.get("name"),
-        model_name,
-        temperature=selected_temp,
-        context_size=selected_ctx,
-    )
     if accepts_json:
-        return JSONResponse({"ok": True, "conversation_id": conversation_id})
+        return FastJSONResponse({"ok": True, "conversation_id": conversation_id})
     return RedirectResponse(
         url=f"/?conversation={conversation_id}",
         status_code=status.HTTP_303_SEE_OTHER,
@@ -514,17 +777,27 @@ async def label_message(
     request: Request,
 ) -> RedirectResponse:
     idle_monitor.touch()
-    body_bytes = await request.body()
-    form_data = parse_qs(body_bytes.decode("utf-8"))
-    target_id = (form_data.get("target_id") or [""])[-1]
-    target_type = (form_data.get("target_type") or [""])[-1]
-    reward_value = int((form_data.get("reward") or ["0"])[-1])
+    form_data = await _read_form(request)
+    target_id = form_data.get("target_id", "")
+    target_type = form_data.get("target_type", "")
+    reward_value = int(form_data.get("reward", "0"))
     if reward_value not in {-2, -1, 0, 1, 2} or not target_id:
         return RedirectResponse(
             url=f"/?conversation={conversation_id}",
             status_code=status.HTTP_303_SEE_OTHER,
     )
-    conversation_store.append_label(conversation_id, target_id, reward_value, target_type)
+    await run_in_threadpool(
+        _record_label, conversation_id, target_id, reward_value, target_type
+    )
+    return RedirectResponse(
+        url=f"/?conversation={conversation_id}",
+        status_code=status.HTTP_303_SEE_OTHER,
+    )
+
+
+def _record_label(conversation_id: str, target_id: str, reward_value: int, target_type: str) -> None:
+    with conversation_lock:
+        conversation_store.append_label(conversation_id, target_id, reward_value, target_type)
     logger.info(
         "Recorded reward for %s target=%s type=%s reward=%d",
         conversation_id,
@@ -532,18 +805,15 @@ async def label_message(
         target_type,
         reward_value,
     )
-    task_service.mark_summary_needed(conversation_id)
-    return RedirectResponse(
-        url=f"/?conversation={conversation_id}",
-        status_code=status.HTTP_303_SEE_OTHER,
-    )
+    with task_lock:
+        task_service.mark_summary_needed(conversation_id)
 
 
 @app.get("/settings", response_class=HTMLResponse)
-async def settings_page() -> HTMLResponse:
+def settings_page() -> HTMLResponse:
     html = render_settings_page(
         settings_manager.settings,
-        _ensure_agents(),
+        settings_manager.agents,
         _status_context(),
     )
     return HTMLResponse(html)
@@ -552,80 +822,83 @@ async def settings_page() -> HTMLResponse:
 @app.post("/settings")
 async def update_settings(request: Request) -> RedirectResponse:
     idle_monitor.touch()
-    body_bytes = await request.body()
-    form_pairs = parse_qs(body_bytes.decode("utf-8"))
-
-    def get_field(name: str, default: str = "") -> str:
-        values = form_pairs.get(name)
-        if not values:
-            return default
-        return values[-1]
-
-    llama = {
-        "base_url": get_field("llama_base_url", settings_manager.settings["llama_cpp"]["base_url"]),
-        "api_key": get_field("llama_api_key"),
-        "model": get_field("llama_model", settings_manager.settings["llama_cpp"]["model"]),
-        "temperature": float(get_field("llama_temperature", str(settings_manager.settings["llama_cpp"].get("temperature", 0.2)))),
-    }
-    agents: List[Dict] = []
-    for idx, default_agent in enumerate(_ensure_agents()):
-        default_temp = default_agent.get("temperature", 0.2)
-        default_ctx = default_agent.get("context_size", 4096)
-        agents.append(
-            {
-                "name": get_field(f"agents_{idx}_name", default_agent["name"]),
-                "description": get_field(f"agents_{idx}_description", ""),
-                "system_prompt": get_field(f"agents_{idx}_prompt", ""),
-                "model": get_field(
-                    f"agents_{idx}_model", default_agent.get("model", llama["model"])
-                ),
-                "temperature": float(
-                    get_field(
-                        f"agents_{idx}_temperature", str(default_temp)
-                    )
-                    or default_temp
-                ),
-                "context_size": int(
-                    get_field(
-                        f"agents_{idx}_context", str(default_ctx)
-                    )
-                    or default_ctx
-                ),
-            }
-        )
-    payload = {
-        "llama_cpp": llama,
-        "agents": agents,
-    }
-    if agents:
-        payload["system_prompt"] = agents[0]["system_prompt"]
-        llama["temperature"] = agents[0].get("temperature", 0.2)
-    settings_manager.save(payload)
-    logger.info(
-        "Settings updated base_url=%s default_model=%s agents=%s",
-        llama["base_url"],
-        llama["model"],
-        ", ".join(agent["name"] for agent in agents),
-    )
+    form_fields = await _read_form(request)
+    await run_in_threadpool(_save_settings, form_fields)
     return RedirectResponse(url="/settings", status_code=status.HTTP_303_SEE_OTHER)
 
 
+def _save_settings(form_fields: Dict[str, str]) -> None:
+    # Readers never block on this: the manager swaps in a saved configuration
+    # as a whole.
+    with settings_lock:
+        def get_field(name: str, default: str = "") -> str:
+            return form_fields.get(name, default)
+
+        llama = {
+            "base_url": get_field("llama_base_url", settings_manager.settings["llama_cpp"]["base_url"]),
+            "api_key": get_field("llama_api_key"),
+            "model": get_field("llama_model", settings_manager.settings["llama_cpp"]["model"]),
+            "temperature": float(get_field("llama_temperature", str(settings_manager.settings["llama_cpp"].get("temperature", 0.2)))),
+        }
+        agents: List[Dict] = []
+        for idx, default_agent in enumerate(settings_manager.agents):
+            default_temp = default_agent.get("temperature", 0.2)
+            default_ctx = default_agent.get("context_size", 4096)
+            agents.append(
+                {
+                    "name": get_field(f"agents_{idx}_name", default_agent["name"]),
+                    "description": get_field(f"agents_{idx}_description", ""),
+                    "system_prompt": get_field(f"agents_{idx}_prompt", ""),
+                    "model": get_field(
+                        f"agents_{idx}_model", default_agent.get("model", llama["model"])
+                    ),
+                    "temperature": float(
+                        get_field(
+                            f"agents_{idx}_temperature", str(default_temp)
+                        )
+                        or default_temp
+                    ),
+                    "context_size": int(
+                        get_field(
+                            f"agents_{idx}_context", str(default_ctx)
+                        )
+                        or default_ctx
+                    ),
+                }
+            )
+        payload = {
+            "llama_cpp": llama,
+            "agents": agents,
+        }
+        if agents:
+            payload["system_prompt"] = agents[0]["system_prompt"]
+            llama["temperature"] = agents[0].get("temperature", 0.2)
+        settings_manager.save(payload)
+        logger.info(
+            "Settings updated base_url=%s default_model=%s agents=%s",
+            llama["base_url"],
+            llama["model"],
+            ", ".join(agent["name"] for agent in agents),
+        )
+
+
 @app.get("/help", response_class=HTMLResponse)
-async def help_page() -> HTMLResponse:
-    agents = _ensure_agents()
+def help_page() -> HTMLResponse:
+    agents = settings_manager.agents
     html = render_help_page(agents)
     return HTMLResponse(html)
 
 
-@app.get("/health/llama", response_class=JSONResponse)
-async def llama_health() -> JSONResponse:
+@app.get("/health/llama")
+async def llama_health() -> FastJSONResponse:
     health_url = _llama_health_url()
     if not health_url:
         llama_status["state"] = "warn"
         llama_status["label"] = "LLM Unknown"
-        return JSONResponse({"status": "warn", "label": "LLM Unknown"})
+        return FastJSONResponse({"status": "warn", "label": "LLM Unknown"})
     try:
-        response = requests.get(health_url, timeout=3)
+        # The probe can block for the full timeout; keep it off the event loop.
+        response = await run_in_threadpool(health_session.get, health_url, timeout=3)
         ok = response.status_code < 400
     except requests.RequestException:
         ok = False
@@ -633,13 +906,14 @@ async def llama_health() -> JSONResponse:
     label = "LLM Connected" if ok else "LLM Offline"
     llama_status["state"] = status
     llama_status["label"] = label
-    return JSONResponse({"status": status, "label": label})
+    return FastJSONResponse({"status": status, "label": label})
 
 
 @app.get("/tasks/{task_id}", response_class=HTMLResponse)
-async def task_detail(task_id: str) -> HTMLResponse:
-    task_service.drain_events()
-    snapshot = task_service.snapshot()
+def task_detail(task_id: str) -> HTMLResponse:
+    with task_lock:
+        task_service.drain_events()
+        snapshot = task_service.snapshot()
     for record in snapshot:
         if record.id == task_id:
             html = render_task_detail_page(record)
@@ -647,20 +921,26 @@ async def task_detail(task_id: str) -> HTMLResponse:
     return HTMLResponse("<h1>Task not found</h1><p>The task may have already completed and been removed.</p>", status_code=status.HTTP_404_NOT_FOUND)
 
 
-@app.get("/state", response_class=JSONResponse)
-async def state_endpoint(conversation: Optional[str] = None) -> JSONResponse:
-    state = _collect_view_state(conversation)
+@app.get("/state")
+def state_endpoint(request: Request, conversation: Optional[str] = None) -> Response:
+    with task_lock:
+        task_service.drain_events()
+    resolved = _resolve_conversation(conversation)
+    # Polling clients mostly find nothing moved; answer those before
+    # rendering anything.
+    etag = _state_etag(*resolved)
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": "no-cache"},
+        )
+    state = _collect_view_state(resolved)
     payload = {
-        "history_html": render_conversation_list(
+        "history_html": _render_history_html(
             state["history"],
             state["active_conversation"],
         ),
-        "messages_html": render_conversation_messages(
-            state["entries"],
-            state["reward_map"],
-            state["tool_reward_map"],
-            state["active_conversation"],
-        ),
+        "messages_html": _render_messages_html(state),
         "tasks_html": _render_tasks_html(state["tasks"]),
         "conversation_title": state["conversation_title"],
         "active_conversation": state["active_conversation"],
@@ -672,16 +952,60 @@ async def state_endpoint(conversation: Optional[str] = None) -> JSONResponse:
         "last_entry_id": state["last_entry_id"],
         "tasks_signature": state["task_signature"],
     }
-    return JSONResponse(payload)
-
-
-@app.get("/status", response_class=JSONResponse)
-async def status_endpoint() -> JSONResponse:
-    task_service.drain_events()
-    snapshot = task_service.snapshot()
+    return FastJSONResponse(payload, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def _state_etag(
+    active_conversation: Optional[str],
+    latest_index: Dict[str, Dict],
+    conversation_metadata: List[ConversationMetadata],
+) -> str:
+    """
+    Tag the /state payload by the revisions it is rendered from.
+    """
+    with task_lock:
+        revision = task_service.revision
+        running = any(task.status == "running" for task in task_service.snapshot())
+    key = (
+        _PROCESS_TOKEN,
+        active_conversation,
+        conversation_store.file_signature(active_conversation) if active_conversation else None,
+        index_store.version,
+        conversation_store.listing_version,
+        revision,
+        # Running cards show elapsed time in five-second ticks.
+        int(time.time() // 5) if running else None,
+        settings_manager.version,
+        tuple(_status_context().values()),
+    )
+    return f'"{hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).hexdigest()}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Apply If-None-Match's weak comparison: `*` or any listed tag matches.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+@app.get("/status")
+def status_endpoint() -> FastJSONResponse:
+    with task_lock:
+        task_service.drain_events()
+        snapshot = task_service.snapshot()
     data = _status_context()
     data["pending_tasks"] = len([task for task in snapshot if task.status != "completed"])
-    return JSONResponse(data)
+    return FastJSONResponse(data)
 
 
 # Convenience include for uvicorn.
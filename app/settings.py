@@ -1,6 +1,9 @@
+import copy
 import json
+import os
+import re
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
 
 
 DEFAULT_SETTINGS: Dict[str, Any] = {
@@ -56,41 +59,138 @@ class SettingsManager:
 
     def __init__(self, path: Path) -> None:
         self.path = path
-        self._settings: Dict[str, Any] | None = None
+        # (version, settings, agents), replaced as a whole so readers on other
+        # threads never see settings from one load next to agents from another.
+        # The version is bumped on every replacement, so callers can cache
+        # values derived from the settings.
+        self._loaded: Optional[Tuple[int, Dict[str, Any], Tuple[Dict[str, Any], ...]]] = None
         self.path.parent.mkdir(parents=True, exist_ok=True)
 
+    @property
+    def version(self) -> int:
+        loaded = self._loaded
+        return loaded[0] if loaded is not None else 0
+
     @property
     def settings(self) -> Dict[str, Any]:
-        if self._settings is None:
-            self._settings = self._load_from_disk()
-        return self._settings
+        return self._current()[1]
+
+    @property
+    def agents(self) -> List[Dict[str, Any]]:
+        """
+        The four agent slots, padded from defaults and with unique aliases.
+
+        Normalised once per load/save; the dicts are shared, so do not mutate them.
+        """
+        return list(self._current()[2])
+
+    def _current(self) -> Tuple[int, Dict[str, Any], Tuple[Dict[str, Any], ...]]:
+        loaded = self._loaded
+        if loaded is None:
+            loaded = self._replace(self._load_from_disk())
+        return loaded
+
+    def _replace(
+        self, settings: Dict[str, Any]
+    ) -> Tuple[int, Dict[str, Any], Tuple[Dict[str, Any], ...]]:
+        loaded = (self.version + 1, settings, tuple(_normalise_agents(settings)))
+        self._loaded = loaded
+        return loaded
 
     def _load_from_disk(self) -> Dict[str, Any]:
         if not self.path.exists():
             self._write(DEFAULT_SETTINGS)
-            return json.loads(json.dumps(DEFAULT_SETTINGS))
+            return copy.deepcopy(DEFAULT_SETTINGS)
         with self.path.open("r", encoding="utf-8") as handle:
             data = json.load(handle)
         # Merge with defaults to backfill new keys without overwriting manual edits.
-        merged = json.loads(json.dumps(DEFAULT_SETTINGS))
+        merged = copy.deepcopy(DEFAULT_SETTINGS)
         _deep_update(merged, data)
         return merged
 
     def save(self, payload: Dict[str, Any]) -> None:
-        config = json.loads(json.dumps(self.settings))
+        config = copy.deepcopy(self.settings)
         _deep_update(config, payload)
         self._write(config)
-        self._settings = config
+        self._replace(config)
 
     def reload(self) -> Dict[str, Any]:
-        self._settings = self._load_from_disk()
-        return self._settings
+        return self._replace(self._load_from_disk())[1]
 
     def _write(self, data: Dict[str, Any]) -> None:
         # Persist as stable, human-readable JSON.
-        with self.path.open("w", encoding="utf-8") as handle:
-            json.dump(data, handle, indent=2, sort_keys=True)
-            handle.write("\n")
+        # Serialise up front so the file is written in one call rather than
+        # json.dump's many small writes, then swap it into place so the worker
+        # never reads a half-written file.
+        payload = (json.dumps(data, indent=2, sort_keys=True) + "\n").encode("utf-8")
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("wb") as handle:
+            handle.write(payload)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, self.path)
+
+
+_ALIAS_RE = re.compile(r"[^a-z0-9]+")
+
+
+def _normalise_agents(settings: Dict[str, Any]) -> List[Dict]:
+    """
+    Pad the configured agents to four slots and fill in missing fields.
+
+    Works on copies so neither the settings nor `DEFAULT_SETTINGS` are mutated.
+    """
+    configured = list(settings.get("agents", []))
+    if len(configured) >= 4:
+        agents = configured[:4]
+    else:
+        fallback = list(DEFAULT_SETTINGS["agents"])
+        combined = configured + fallback[len(configured) : 4]
+        while len(combined) < 4:
+            combined.append(
+                {
+                    "name": f"Agent {len(combined) + 1}",
+                    "description": "",
+                    "system_prompt": settings.get(
+                        "system_prompt", DEFAULT_SETTINGS["system_prompt"]
+                    ),
+                    "model": settings.get("llama_cpp", {}).get(
+                        "model", DEFAULT_SETTINGS["llama_cpp"]["model"]
+                    ),
+                    "temperature": DEFAULT_SETTINGS["agents"][0]["temperature"],
+                    "context_size": DEFAULT_SETTINGS["agents"][0]["context_size"],
+                }
+            )
+        agents = combined[:4]
+    alias_counts: Dict[str, int] = {}
+    default_prompt = settings.get("system_prompt", DEFAULT_SETTINGS["system_prompt"])
+    default_model = settings.get("llama_cpp", {}).get(
+        "model", DEFAULT_SETTINGS["llama_cpp"]["model"]
+    )
+    default_temperature = DEFAULT_SETTINGS["agents"][0]["temperature"]
+    default_context = DEFAULT_SETTINGS["agents"][0]["context_size"]
+    normalised: List[Dict] = []
+    for index, configured_agent in enumerate(agents):
+        agent = dict(configured_agent)
+        agent.setdefault("description", "")
+        agent.setdefault("system_prompt", default_prompt)
+        agent.setdefault("model", default_model)
+        agent.setdefault("temperature", default_temperature)
+        agent.setdefault("context_size", default_context)
+        alias = agent.get("alias")
+        if not alias:
+            alias = _ALIAS_RE.sub("-", agent["name"].lower()).strip("-")
+        if not alias:
+            alias = f"agent-{index + 1}"
+        base_alias = alias
+        counter = 1
+        while alias in alias_counts:
+            counter += 1
+            alias = f"{base_alias}-{counter}"
+        alias_counts[alias] = 1
+        agent["alias"] = alias
+        normalised.append(agent)
+    return normalised
 
 
 def _deep_update(target: Dict[str, Any], source: Dict[str, Any]) -> None:
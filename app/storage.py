@@ -1,38 +1,145 @@
 from __future__ import annotations
 
+import calendar
+import contextlib
+import gzip
 import json
 import os
+import random
 import time
-from collections import defaultdict
-from dataclasses import dataclass
-from datetime import datetime
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Sequence, Set
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 from uuid import uuid4
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None  # type: ignore[assignment]
+
+if fcntl is not None:
+    _LOCK_SH, _LOCK_EX, _LOCK_UN = fcntl.LOCK_SH, fcntl.LOCK_EX, fcntl.LOCK_UN
+else:  # pragma: no cover - non-POSIX platforms
+    _LOCK_SH = _LOCK_EX = _LOCK_UN = 0
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore[assignment]
+
 ISO_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+# Conversation files kept open for appending by one ConversationStore.
+MAX_OPEN_HANDLES = 32
+# Parsed conversations kept in memory by one ConversationStore.
+MAX_CACHED_CONVERSATIONS = 64
+# A conversation file growing past this is moved into a compressed segment.
+SEGMENT_BYTES = 256 * 1024
+_MESSAGE_TYPES = frozenset({"message", "tool_call", "tool_result", "reasoning"})
+
+
+# (unix second, "YYYY-MM-DDTHH:MM:SS." for that second)
+_utc_prefix: Tuple[int, str] = (-1, "")
 
 
 def utcnow() -> str:
-    return datetime.utcnow().strftime(ISO_FORMAT)
+    """
+    Return the current UTC time formatted with `ISO_FORMAT`.
 
+    Appends come in bursts, so the date part is only formatted when the
+    second changes.
+    """
+    global _utc_prefix
+    seconds, micros = divmod(time.time_ns() // 1000, 1_000_000)
+    cached_second, prefix = _utc_prefix
+    if seconds != cached_second:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S.", time.gmtime(seconds))
+        _utc_prefix = (seconds, prefix)
+    return f"{prefix}{micros:06d}Z"
 
-def _append_jsonl(path: Path, payload: Dict) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as handle:
-        handle.write(json.dumps(payload))
-        handle.write("\n")
 
+# Entry ids only need to be unique, not unpredictable, so they come from a
+# urandom-seeded PRNG instead of a getrandom() call per uuid4(). A forked
+# worker would otherwise replay the parent's sequence; spawned workers
+# (the only kind without os.register_at_fork) seed their own on import.
+_id_random = random.Random()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_id_random.seed)
 
-def _iter_jsonl(path: Path) -> Iterable[Dict]:
-    if not path.exists():
-        return []
-    with path.open("r", encoding="utf-8") as handle:
-        for line in handle:
-            line = line.strip()
-            if not line:
-                continue
-            yield json.loads(line)
+
+def new_id() -> str:
+    """
+    Return a random 32-character hex id, the same shape as `uuid4().hex`.
+    """
+    return f"{_id_random.getrandbits(128):032x}"
+
+
+# Integers orjson reads back exactly; wider ones would come back as floats.
+_ORJSON_INT_RANGE = range(-(1 << 63), 1 << 64)
+
+
+def _reject_wide_ints(value: Any) -> None:
+    if isinstance(value, int):
+        if value not in _ORJSON_INT_RANGE:
+            raise TypeError(f"Integer {value} cannot be stored: it exceeds 64 bits.")
+    elif isinstance(value, dict):
+        for item in value.values():
+            _reject_wide_ints(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _reject_wide_ints(item)
+
+
+def _dumps(payload: Dict) -> bytes:
+    """
+    Encode one JSONL line so that `_loads` reads it back unchanged.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload)
+        except TypeError:
+            # e.g. non-string keys or lone surrogates: the stdlib encodes
+            # them and `_loads` reads them back through its fallback. Wide
+            # integers are refused instead of silently turning into floats.
+            _reject_wide_ints(payload)
+    return json.dumps(payload).encode("utf-8")
+
+
+def _loads(line: bytes) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:
+            # Valid for the stdlib only: NaN or Infinity in files written by
+            # json.dumps, or escaped lone surrogates.
+            pass
+    return json.loads(line)
+
+
+def _flock(fd: int, operation: int) -> None:
+    """
+    Take or release an advisory lock on `fd` (`_LOCK_SH`, `_LOCK_EX`, `_LOCK_UN`).
+
+    The locks keep appends from the web process and the worker apart from a
+    segment rotation. Without fcntl (e.g. on Windows) this does nothing.
+    """
+    if fcntl is not None:
+        fcntl.flock(fd, operation)
+
+
+def _read_jsonl_from(handle: BinaryIO, offset: int) -> Tuple[int, List[Dict]]:
+    """
+    Parse the complete lines after byte `offset` and return the new offset.
+
+    A trailing line without its newline (an append in progress) is left for
+    the next call.
+    """
+    handle.seek(offset)
+    data = handle.read()
+    end = data.rfind(b"\n") + 1
+    records = [_loads(line) for line in data[:end].splitlines() if line.strip()]
+    return offset + end, records
 
 
 @dataclass
@@ -40,16 +147,67 @@ class ConversationMetadata:
     conversation_id: str
     path: Path
     last_modified: datetime
+    # Formatted once here rather than on every history render.
+    last_modified_iso: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.last_modified_iso = self.last_modified.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+@dataclass
+class _ParsedConversation:
+    inode: int
+    # Compressed segments read into `records`; the head file follows them.
+    segments: int = 0
+    signature: Tuple[int, int] = (0, 0)
+    offset: int = 0
+    # Tag-merged entries in display order; new records are folded in by
+    # `_merge_tags` without revisiting the ones already read.
+    entries: List[Dict] = field(default_factory=list)
+    by_id: Dict[str, Dict] = field(default_factory=dict)
+    # Tags whose target has not been read yet.
+    pending_tags: Dict[str, Set[str]] = field(default_factory=lambda: defaultdict(set))
+
+
+@dataclass
+class _AppendHandle:
+    file: BinaryIO
+    # Size of the file as far as this process knows; checked against the
+    # real size before rotating.
+    size: int
 
 
 class ConversationStore:
     """
     Append-only conversation store backed by JSONL files on disk.
+
+    Each conversation is a head file, `conversation_<id>.jsonl`, preceded by
+    any number of gzip segments, `conversation_<id>.<n>.jsonl.gz`. When the
+    head grows past `SEGMENT_BYTES` it is compressed into the next segment and
+    truncated. Appends and reads hold a shared flock on the head and the
+    rotation holds it exclusively, since both processes write to it.
     """
 
     def __init__(self, root: Path) -> None:
         self.root = root / "conversations"
         self.root.mkdir(parents=True, exist_ok=True)
+        # In-memory mirror of the conversation listing with each file's
+        # (mtime_ns, size). The worker appends without touching the directory,
+        # so every listing re-stats the files and rebuilds only what changed.
+        self._meta: Dict[str, Tuple[Tuple[int, int], ConversationMetadata]] = {}
+        self._meta_sorted: List[ConversationMetadata] = []
+        # Bumped whenever the listing changes, so callers can key caches on it.
+        self.listing_version = 0
+        # conversation id -> (reward_map, tool_reward_map). Labels are only
+        # written by the web process, so these are kept up to date in place.
+        self._reward_maps: Dict[str, Tuple[Dict[str, int], Dict[str, int]]] = {}
+        # conversation id -> append handle, least recently used first.
+        self._handles: "OrderedDict[str, _AppendHandle]" = OrderedDict()
+        self._batching: Set[str] = set()
+        self._last_position = 0
+        # conversation id -> parsed file contents, least recently used first.
+        # Appends by any process are picked up by parsing only the new tail.
+        self._parsed: "OrderedDict[str, _ParsedConversation]" = OrderedDict()
 
     def create_conversation(
         self,
@@ -62,7 +220,7 @@ class ConversationStore:
     ) -> str:
         conversation_id = uuid4().hex
         metadata_entry = {
-            "id": uuid4().hex,
+            "id": new_id(),
             "timestamp": utcnow(),
             "role": "system",
             "type": "metadata",
@@ -76,65 +234,241 @@ class ConversationStore:
             "ordering": self.new_ordering(conversation_id, "system"),
             "tags": [],
         }
-        self.append_entry(conversation_id, metadata_entry)
+        self.append_entry(conversation_id, metadata_entry, owned=True)
         return conversation_id
 
     def _conversation_path(self, conversation_id: str) -> Path:
         return self.root / f"conversation_{conversation_id}.jsonl"
 
-    def append_entry(self, conversation_id: str, entry: Dict) -> None:
-        payload = dict(entry)
-        payload.setdefault("id", uuid4().hex)
-        payload.setdefault("timestamp", utcnow())
+    def _segment_path(self, conversation_id: str, number: int) -> Path:
+        return self.root / f"conversation_{conversation_id}.{number}.jsonl.gz"
+
+    def append_entry(self, conversation_id: str, entry: Dict, *, owned: bool = False) -> None:
+        """
+        Append `entry`, filling in id, timestamp, ordering and normalised tags.
+
+        The caller's dict is copied first unless `owned` says it was built for
+        this call and may be filled in place.
+        """
+        payload = entry if owned else dict(entry)
+        if "id" not in payload:
+            payload["id"] = new_id()
+        if "timestamp" not in payload:
+            payload["timestamp"] = utcnow()
         if "ordering" not in payload:
             payload["ordering"] = self.new_ordering(conversation_id, payload.get("role") or "system")
-        tags = payload.get("tags") or []
-        payload["tags"] = sorted(set(tags))
-        _append_jsonl(self._conversation_path(conversation_id), payload)
+        tags = payload.get("tags")
+        # Most entries carry no tags; only normalise the ones that do.
+        payload["tags"] = sorted(set(tags)) if tags else []
+        self._write(conversation_id, payload)
+
+    def append_entries(self, conversation_id: str, entries: List[Dict], *, owned: bool = False) -> None:
+        """
+        Append several entries with a single flush and fsync; see `append_entry`.
+        """
+        with self.batch(conversation_id):
+            for entry in entries:
+                self.append_entry(conversation_id, entry, owned=owned)
+
+    def _append_handle(self, conversation_id: str) -> _AppendHandle:
+        handle = self._handles.pop(conversation_id, None)
+        if handle is None:
+            if len(self._handles) >= MAX_OPEN_HANDLES:
+                _, oldest = self._handles.popitem(last=False)
+                oldest.file.close()
+            file = self._conversation_path(conversation_id).open("ab", buffering=65536)
+            handle = _AppendHandle(file=file, size=os.fstat(file.fileno()).st_size)
+        self._handles[conversation_id] = handle
+        return handle
+
+    def _write(self, conversation_id: str, payload: Dict) -> None:
+        handle = self._append_handle(conversation_id)
+        line = _dumps(payload) + b"\n"
+        handle.size += len(line)
+        if conversation_id in self._batching:
+            # batch() holds the lock and flushes on exit.
+            handle.file.write(line)
+            return
+        fd = handle.file.fileno()
+        _flock(fd, _LOCK_SH)
+        try:
+            # One write per line keeps O_APPEND writes from the web process
+            # and the worker from interleaving.
+            handle.file.write(line)
+            handle.file.flush()
+        finally:
+            _flock(fd, _LOCK_UN)
+        self._maybe_rotate(conversation_id, handle)
+
+    def _maybe_rotate(self, conversation_id: str, handle: _AppendHandle) -> None:
+        if handle.size < SEGMENT_BYTES:
+            return
+        fd = handle.file.fileno()
+        _flock(fd, _LOCK_EX)
+        try:
+            # The other process may have rotated the file already.
+            size = os.fstat(fd).st_size
+            if size >= SEGMENT_BYTES:
+                with self._conversation_path(conversation_id).open("rb") as source:
+                    data = source.read(size)
+                number = 1
+                while self._segment_path(conversation_id, number).exists():
+                    number += 1
+                segment = self._segment_path(conversation_id, number)
+                tmp_path = segment.with_name(f"{segment.name}.{os.getpid()}.tmp")
+                with tmp_path.open("wb") as target:
+                    target.write(gzip.compress(data, compresslevel=1))
+                    target.flush()
+                    os.fsync(target.fileno())
+                os.replace(tmp_path, segment)
+                os.ftruncate(fd, 0)
+                size = 0
+            handle.size = size
+        finally:
+            _flock(fd, _LOCK_UN)
+
+    @contextlib.contextmanager
+    def batch(self, conversation_id: str) -> Iterator[None]:
+        """
+        Buffer appends to `conversation_id` and flush and fsync them once on exit.
+
+        Entries written inside the block are not visible to readers (in this
+        or any other process) until it exits.
+        """
+        if conversation_id in self._batching:
+            yield
+            return
+        handle = self._append_handle(conversation_id)
+        fd = handle.file.fileno()
+        _flock(fd, _LOCK_SH)
+        self._batching.add(conversation_id)
+        try:
+            yield
+        finally:
+            self._batching.discard(conversation_id)
+            try:
+                handle.file.flush()
+                os.fsync(fd)
+            finally:
+                _flock(fd, _LOCK_UN)
+        self._maybe_rotate(conversation_id, handle)
+
+    def close(self) -> None:
+        while self._handles:
+            _, handle = self._handles.popitem()
+            handle.file.close()
+
+    def file_signature(self, conversation_id: str) -> Optional[Tuple[int, int]]:
+        """
+        Return `(mtime_ns, size)` of the conversation file, or None if it is missing.
+
+        Any append changes the signature, so it can key caches of parsed entries.
+        """
+        try:
+            stat = self._conversation_path(conversation_id).stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
 
     def list_conversations(self) -> List[ConversationMetadata]:
-        items: List[ConversationMetadata] = []
-        for file in sorted(self.root.glob("conversation_*.jsonl")):
-            try:
-                conversation_id = file.stem.split("_", 1)[1]
-            except IndexError:
-                continue
-            stat = file.stat()
-            items.append(
-                ConversationMetadata(
-                    conversation_id=conversation_id,
-                    path=file,
-                    last_modified=datetime.utcfromtimestamp(stat.st_mtime),
-                )
+        """
+        Return conversations, most recently modified first.
+
+        The files are re-stated on every call, so appends by any process show
+        up in `last_modified`; the listing is only re-sorted when one changed.
+        """
+        meta: Dict[str, Tuple[Tuple[int, int], ConversationMetadata]] = {}
+        changed = False
+        with os.scandir(self.root) as it:
+            for dir_entry in it:
+                name = dir_entry.name
+                if not (name.startswith("conversation_") and name.endswith(".jsonl")):
+                    continue
+                conversation_id = name[len("conversation_") : -len(".jsonl")]
+                if not conversation_id:
+                    continue
+                try:
+                    stat = dir_entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                signature = (stat.st_mtime_ns, stat.st_size)
+                cached = self._meta.get(conversation_id)
+                if cached is None or cached[0] != signature:
+                    changed = True
+                    cached = (
+                        signature,
+                        ConversationMetadata(
+                            conversation_id=conversation_id,
+                            path=self.root / name,
+                            last_modified=datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+                        ),
+                    )
+                meta[conversation_id] = cached
+        if changed or len(meta) != len(self._meta):
+            self._meta = meta
+            self._meta_sorted = sorted(
+                (item for _, item in meta.values()),
+                key=lambda item: item.last_modified,
+                reverse=True,
             )
-        items.sort(key=lambda item: item.last_modified, reverse=True)
-        return items
+            self.listing_version += 1
+        return list(self._meta_sorted)
 
     def load_conversation(self, conversation_id: str) -> List[Dict]:
-        path = self._conversation_path(conversation_id)
-        raw_entries = list(_iter_jsonl(path))
-        entries: List[Dict] = []
-        tag_updates: Dict[str, Set[str]] = defaultdict(set)
-        for record in raw_entries:
-            if record.get("type") == "tag":
-                content = record.get("content") or {}
-                target = content.get("target")
-                tags: Sequence[str] = content.get("tags") or ()
-                action = content.get("action", "add")
-                if target and tags and action == "add":
-                    tag_updates[target].update(tags)
-                continue
-            entries.append(record)
-        for entry in entries:
-            merged: Set[str] = set(entry.get("tags") or [])
-            if entry.get("id") in tag_updates:
-                merged.update(tag_updates[entry["id"]])
-            entry["tags"] = sorted(merged)
-        entries.sort(key=_entry_sort_key)
-        return entries
+        """
+        Return the conversation's entries with tags merged, in display order.
+
+        The list and the entry dicts are fresh copies; nested values are shared
+        with the cache and must not be mutated in place.
+        """
+        parsed = self._refresh_parsed(conversation_id)
+        if parsed is None:
+            return []
+        return [dict(entry) for entry in parsed.entries]
+
+    def _refresh_parsed(self, conversation_id: str) -> Optional[_ParsedConversation]:
+        """
+        Bring the cached parse of the conversation up to date with the files.
+        """
+        try:
+            head = self._conversation_path(conversation_id).open("rb")
+        except FileNotFoundError:
+            self._parsed.pop(conversation_id, None)
+            return None
+        with head:
+            _flock(head.fileno(), _LOCK_SH)
+            stat = os.fstat(head.fileno())
+            parsed = self._parsed.pop(conversation_id, None)
+            if (
+                parsed is None
+                or parsed.inode != stat.st_ino
+                or stat.st_size < parsed.offset
+                or self._segment_path(conversation_id, parsed.segments + 1).exists()
+            ):
+                parsed = _ParsedConversation(inode=stat.st_ino)
+                parsed.segments = self._read_segments(conversation_id, parsed)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if parsed.signature != signature:
+                parsed.offset, records = _read_jsonl_from(head, parsed.offset)
+                _merge_tags(parsed, records)
+                parsed.signature = signature
+        self._parsed[conversation_id] = parsed
+        if len(self._parsed) > MAX_CACHED_CONVERSATIONS:
+            self._parsed.popitem(last=False)
+        return parsed
+
+    def _read_segments(self, conversation_id: str, parsed: _ParsedConversation) -> int:
+        number = 0
+        while True:
+            try:
+                data = gzip.decompress(self._segment_path(conversation_id, number + 1).read_bytes())
+            except FileNotFoundError:
+                return number
+            _merge_tags(parsed, [_loads(line) for line in data.splitlines() if line.strip()])
+            number += 1
 
     def append_user_message(self, conversation_id: str, content: str) -> str:
-        entry_id = uuid4().hex
+        entry_id = new_id()
         entry = {
             "id": entry_id,
             "role": "user",
@@ -143,7 +477,7 @@ class ConversationStore:
             "ordering": self.new_ordering(conversation_id, "send"),
             "tags": [],
         }
-        self.append_entry(conversation_id, entry)
+        self.append_entry(conversation_id, entry, owned=True)
         return entry_id
 
     def append_label(
@@ -154,7 +488,7 @@ class ConversationStore:
         target_type: str,
     ) -> None:
         entry = {
-            "id": uuid4().hex,
+            "id": new_id(),
             "role": "system",
             "type": "label",
             "content": {
@@ -165,19 +499,55 @@ class ConversationStore:
             "ordering": self.new_ordering(conversation_id, "system"),
             "tags": [],
         }
-        self.append_entry(conversation_id, entry)
+        self.append_entry(conversation_id, entry, owned=True)
+        maps = self._reward_maps.get(conversation_id)
+        if maps is not None:
+            _apply_label(maps, entry["content"])
+
+    def reward_maps(
+        self, conversation_id: str, entries: Optional[Iterable[Dict]] = None
+    ) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """
+        Return `(reward_map, tool_reward_map)`: the latest reward per target.
+
+        Built from the conversation once (from `entries` if the caller already
+        loaded them) and then maintained by `append_label`. Do not mutate.
+        """
+        maps = self._reward_maps.get(conversation_id)
+        if maps is None:
+            maps = ({}, {})
+            if entries is None:
+                entries = self.load_conversation(conversation_id)
+            for entry in entries:
+                if entry.get("type") == "label":
+                    _apply_label(maps, entry.get("content") or {})
+            self._reward_maps[conversation_id] = maps
+        return maps
 
     def last_message_timestamp(self, conversation_id: str) -> Optional[datetime]:
-        messages = self.load_conversation(conversation_id)
-        for entry in reversed(messages):
-            if entry["type"] in {"message", "tool_call", "tool_result", "reasoning"}:
-                return datetime.strptime(entry["timestamp"], ISO_FORMAT)
+        """
+        Return the timestamp of the newest message-like entry in display order.
+
+        Only the lines appended since the last read are parsed, and the cached
+        entries are scanned from the end without being copied.
+        """
+        parsed = self._refresh_parsed(conversation_id)
+        if parsed is None:
+            return None
+        for entry in reversed(parsed.entries):
+            if entry.get("type") in _MESSAGE_TYPES:
+                return _parse_timestamp(entry["timestamp"])
         return None
 
     def new_ordering(self, conversation_id: str, direction: str) -> Dict:
+        # Positions stay wall-clock based so entries written by the web process
+        # and the worker interleave correctly, but never repeat or go backwards
+        # within one store.
+        position = max(time.time_ns(), self._last_position + 1)
+        self._last_position = position
         return {
             "direction": direction,
-            "position": time.time_ns(),
+            "position": position,
         }
 
     def append_tag(
@@ -203,7 +573,97 @@ class ConversationStore:
             "ordering": self.new_ordering(conversation_id, "system"),
             "tags": [],
         }
-        self.append_entry(conversation_id, entry)
+        self.append_entry(conversation_id, entry, owned=True)
+
+
+def _merge_tags(parsed: _ParsedConversation, records: List[Dict]) -> None:
+    """
+    Fold newly read records into `parsed.entries`, applying tag records to
+    their targets.
+
+    `append_entry` already stores each entry's own tags sorted and unique, so
+    only entries that receive tag records are re-sorted. New entries normally
+    sort after the existing ones and are simply appended.
+    """
+    by_id = parsed.by_id
+    pending = parsed.pending_tags
+    added: List[Dict] = []
+    for record in records:
+        if record.get("type") == "tag":
+            content = record.get("content") or {}
+            target = content.get("target")
+            tags: Sequence[str] = content.get("tags") or ()
+            if not (target and tags and content.get("action", "add") == "add"):
+                continue
+            entry = by_id.get(target)
+            if entry is None:
+                pending[target].update(tags)
+            else:
+                entry["tags"] = sorted(set(entry["tags"]).union(tags))
+            continue
+        entry_id = record.get("id")
+        if entry_id in by_id:
+            # A rotation interrupted between writing the segment and
+            # truncating the head leaves its lines in both.
+            continue
+        entry = dict(record)
+        entry["tags"] = entry.get("tags") or []
+        if entry_id:
+            by_id[entry_id] = entry
+            if entry_id in pending:
+                entry["tags"] = sorted(pending.pop(entry_id).union(entry["tags"]))
+        added.append(entry)
+    if not added:
+        return
+    added.sort(key=_entry_sort_key)
+    entries = parsed.entries
+    in_order = not entries or _entry_sort_key(entries[-1]) <= _entry_sort_key(added[0])
+    entries.extend(added)
+    if not in_order:
+        entries.sort(key=_entry_sort_key)
+
+
+def _apply_label(
+    maps: Tuple[Dict[str, int], Dict[str, int]], content: Dict
+) -> None:
+    reward_map, tool_reward_map = maps
+    target = content.get("target")
+    reward = content.get("reward")
+    if content.get("target_type") == "tool_call":
+        tool_reward_map[target] = reward
+    else:
+        reward_map[target] = reward
+
+
+def _parse_timestamp(timestamp: str) -> datetime:
+    """
+    Parse an `ISO_FORMAT` timestamp into a naive UTC datetime.
+    """
+    if len(timestamp) == 27 and timestamp[26] == "Z":
+        # fromisoformat is implemented in C; strptime is not.
+        return datetime.fromisoformat(timestamp[:26])
+    return datetime.strptime(timestamp, ISO_FORMAT)
+
+
+def _timestamp_ns(timestamp: str) -> int:
+    """
+    Convert an `ISO_FORMAT` UTC timestamp to nanoseconds since the epoch.
+    """
+    if len(timestamp) != 27 or timestamp[26] != "Z":
+        # Not what utcnow() writes; let strptime deal with it.
+        parsed = datetime.strptime(timestamp, ISO_FORMAT)
+        return calendar.timegm(parsed.timetuple()) * 1_000_000_000 + parsed.microsecond * 1000
+    seconds = calendar.timegm(
+        (
+            int(timestamp[0:4]),
+            int(timestamp[5:7]),
+            int(timestamp[8:10]),
+            int(timestamp[11:13]),
+            int(timestamp[14:16]),
+            int(timestamp[17:19]),
+        )
+    )
+    return seconds * 1_000_000_000 + int(timestamp[20:26]) * 1000
 
 
 def _entry_sort_key(entry: Dict) -> tuple:
@@ -213,7 +673,7 @@ def _entry_sort_key(entry: Dict) -> tuple:
         timestamp = entry.get("timestamp")
         if timestamp:
             try:
-                position = int(datetime.strptime(timestamp, ISO_FORMAT).timestamp() * 1_000_000_000)
+                position = _timestamp_ns(timestamp)
             except ValueError:
                 position = 0
         else:
@@ -237,44 +697,102 @@ class IndexStore:
         self.max_lines = max_lines
         self.path.parent.mkdir(parents=True, exist_ok=True)
         self._line_count = self._count_lines()
+        # Most recently accessed conversation, as recorded by this process.
+        self.mru_conversation_id: Optional[str] = None
+        # Merged index as of byte `_scan_offset` of the file with inode
+        # `_scan_inode`; a prune by either process replaces the file.
+        self._latest: Dict[str, Dict] = {}
+        self._scan_inode: Optional[int] = None
+        self._scan_offset = 0
 
     def _count_lines(self) -> int:
         if not self.path.exists():
             return 0
-        with self.path.open("r", encoding="utf-8") as handle:
-            return sum(1 for _ in handle)
+        lines = 0
+        with self.path.open("rb") as handle:
+            while chunk := handle.read(1 << 20):
+                lines += chunk.count(b"\n")
+        return lines
 
     def append(self, payload: Dict) -> None:
         payload.setdefault("timestamp", utcnow())
-        _append_jsonl(self.path, payload)
+        line = _dumps(payload) + b"\n"
+        with self.path.open("ab") as handle:
+            handle.write(line)
+            handle.flush()
+            stat = os.fstat(handle.fileno())
+        # Fold our own line into the merged index when nothing else was
+        # appended since the last scan, so it is current without a re-read.
+        if stat.st_ino == self._scan_inode and stat.st_size == self._scan_offset + len(line):
+            _merge_index_entry(self._latest, payload)
+            self._scan_offset = stat.st_size
         self._line_count += 1
         if self._line_count > self.max_lines:
             self.prune()
 
     def latest_index(self) -> Dict[str, Dict]:
-        latest: Dict[str, Dict] = {}
-        for entry in _iter_jsonl(self.path):
-            cid = entry.get("conversation_id")
-            if not cid:
-                continue
-            record = latest.get(cid, {"conversation_id": cid})
-            # Merge newer fields while retaining previous summary/title if omitted.
-            for key, value in entry.items():
-                if key in {"conversation_id"}:
-                    continue
-                record[key] = value
-            record["timestamp"] = entry.get("timestamp", record.get("timestamp"))
-            latest[cid] = record
-        return latest
-
-    def record_access(self, conversation_id: str) -> None:
-        self.append(
-            {
-                "conversation_id": conversation_id,
-                "kind": "access",
-                "last_accessed": utcnow(),
-            }
-        )
+        """
+        Return the merged record per conversation id.
+
+        Only lines appended since the previous call are parsed. The returned
+        mapping and its records are copies the caller may modify.
+        """
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            self._latest, self._scan_inode, self._scan_offset = {}, None, 0
+            return {}
+        if stat.st_ino != self._scan_inode or stat.st_size < self._scan_offset:
+            self._latest, self._scan_inode, self._scan_offset = {}, stat.st_ino, 0
+        if stat.st_size != self._scan_offset:
+            with self.path.open("rb") as handle:
+                self._scan_offset, records = _read_jsonl_from(handle, self._scan_offset)
+            for entry in records:
+                _merge_index_entry(self._latest, entry)
+        return {cid: dict(record) for cid, record in self._latest.items()}
+
+    @property
+    def version(self) -> Tuple[Optional[int], int]:
+        """
+        Identify the index contents as of the last `latest_index()` call.
+        """
+        return self._scan_inode, self._scan_offset
+
+    def record_access(
+        self, conversation_id: str, latest: Optional[Dict[str, Dict]] = None
+    ) -> Dict:
+        """
+        Append an access record and return the conversation's merged index record.
+
+        Pass the mapping from a recent `latest_index()` call as `latest` to have
+        it updated in place instead of re-reading the index afterwards.
+
+        Re-opening the most recently accessed conversation within the same
+        minute writes nothing and keeps the earlier access time; it is
+        already first in access order, and pages polling it stay unchanged.
+        """
+        if latest is None:
+            latest = {}
+        now = utcnow()
+        if self._is_redundant_access(conversation_id, now):
+            return latest.setdefault(conversation_id, dict(self._latest[conversation_id]))
+        payload = {
+            "conversation_id": conversation_id,
+            "kind": "access",
+            "last_accessed": now,
+        }
+        self.append(payload)
+        self.mru_conversation_id = conversation_id
+        return _merge_index_entry(latest, payload)
+
+    def _is_redundant_access(self, conversation_id: str, now: str) -> bool:
+        if conversation_id != self.mru_conversation_id:
+            return False
+        cached = self._latest.get(conversation_id)
+        if cached is None or cached.get("kind") != "access":
+            return False
+        # ISO timestamps share their first 16 characters within a minute.
+        return (cached.get("last_accessed") or "")[:16] == now[:16]
 
     def record_summary(
         self,
@@ -294,13 +812,33 @@ class IndexStore:
 
     def prune(self) -> None:
         latest = self.latest_index()
-        tmp_path = self.path.with_suffix(".tmp")
-        with tmp_path.open("w", encoding="utf-8") as handle:
-            for entry in latest.values():
-                handle.write(json.dumps(entry))
-                handle.write("\n")
+        # Both processes may prune; give each its own temporary file.
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        data = b"".join(_dumps(entry) + b"\n" for entry in latest.values())
+        with tmp_path.open("wb") as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+            inode = os.fstat(handle.fileno()).st_ino
+        size = len(data)
         os.replace(tmp_path, self.path)
         self._line_count = len(latest)
+        self._latest, self._scan_inode, self._scan_offset = latest, inode, size
+
+
+def _merge_index_entry(latest: Dict[str, Dict], entry: Dict) -> Dict:
+    cid = entry.get("conversation_id")
+    if not cid:
+        return {}
+    record = latest.get(cid, {"conversation_id": cid})
+    # Merge newer fields while retaining previous summary/title if omitted.
+    for key, value in entry.items():
+        if key in {"conversation_id"}:
+            continue
+        record[key] = value
+    record["timestamp"] = entry.get("timestamp", record.get("timestamp"))
+    latest[cid] = record
+    return record
 
 
 def build_title(summary: Optional[str], fallback: str) -> str:
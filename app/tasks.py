@@ -1,26 +1,40 @@
 from __future__ import annotations
 
 import asyncio
+import heapq
 import json
 import logging
 import multiprocessing as mp
+import os
 import queue
+import threading
 import time
+from collections import OrderedDict, deque
 from dataclasses import dataclass, field
-from itertools import count
+from multiprocessing.connection import Connection
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple
-from uuid import uuid4
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Optional, Set, Tuple
 
-from .llm import LlamaCppClient, LlamaCppError, ToolRegistry, register_default_tools, unpack_assistant_message
 from .settings import SettingsManager
-from .storage import ConversationStore, IndexStore, build_title, utcnow
+from .storage import ConversationStore, IndexStore, build_title, new_id, utcnow
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from .llm import LlamaCppClient, ToolRegistry
 
 PRIORITY_HIGH = 0
 PRIORITY_NORMAL = 5
 PRIORITY_LOW = 10
 
+# Polling endpoints drain the event queue at most this often (seconds).
+DRAIN_INTERVAL = 0.05
+# Finished tasks kept around for the task strip and detail pages.
+COMPLETED_TASKS_SHOWN = 2
+
 logger = logging.getLogger("webui.worker")
 
 
@@ -39,14 +53,76 @@ class TaskRecord:
     started_at: Optional[str] = None
 
 
+@dataclass(slots=True, frozen=True)
+class WorkerConfig:
+    """
+    The settings the worker uses, extracted once per change to the settings file.
+    """
+
+    base_url: str
+    api_key: str
+    default_model: str
+    system_prompt: str
+    agents_by_name: Dict[Optional[str], Dict[str, Any]]
+    default_agent: Dict[str, Any]
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> WorkerConfig:
+        agents = settings.get("agents") or []
+        llama = settings["llama_cpp"]
+        return cls(
+            base_url=llama["base_url"],
+            api_key=llama.get("api_key", ""),
+            default_model=llama["model"],
+            system_prompt=settings["system_prompt"],
+            # Reversed so the first agent wins when names repeat, as a scan would.
+            agents_by_name={agent.get("name"): agent for agent in reversed(agents)},
+            default_agent=agents[0] if agents else {},
+        )
+
+
+def _encode_frame(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value).encode("utf-8")
+
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _json_text(value: Any) -> str:
+    if orjson is not None:
+        try:
+            return orjson.dumps(value).decode("utf-8")
+        except TypeError:
+            # e.g. non-string keys; let the stdlib decide.
+            pass
+    return json.dumps(value, ensure_ascii=False)
+
+
+_JSON_SCALARS = (str, int, float, bool, type(None))
+
+
+def _is_jsonable(value: Any) -> bool:
+    # Mirrors what json.dumps accepts, without encoding anything.
+    if isinstance(value, _JSON_SCALARS):
+        return True
+    if isinstance(value, (list, tuple)):
+        return all(_is_jsonable(item) for item in value)
+    if isinstance(value, dict):
+        return all(
+            isinstance(key, _JSON_SCALARS) and _is_jsonable(item)
+            for key, item in value.items()
+        )
+    return False
+
+
 def _ensure_jsonable(value: Any) -> Any:
-    try:
-        json.dumps(value)
+    if _is_jsonable(value):
         return value
-    except TypeError:
-        if hasattr(value, "dict"):
-            return value.dict()
-        return str(value)
+    if hasattr(value, "dict"):
+        return value.dict()
+    return str(value)
 
 
 def _mark_trailing_completions_overridden(
@@ -70,13 +146,14 @@ def _mark_trailing_completions_overridden(
     trailing_ids = [entry_id for entry_id in trailing_ids if entry_id]
     if not trailing_ids:
         return
-    for entry_id in trailing_ids:
-        conversation_store.append_tag(
-            conversation_id,
-            entry_id,
-            ["overridden"],
-            reason="superseded",
-        )
+    with conversation_store.batch(conversation_id):
+        for entry_id in trailing_ids:
+            conversation_store.append_tag(
+                conversation_id,
+                entry_id,
+                ["overridden"],
+                reason="superseded",
+            )
     trailing_set = set(trailing_ids)
     for entry in conversation:
         if entry.get("id") in trailing_set:
@@ -105,7 +182,7 @@ def _append_error_entry(
         "ordering": conversation_store.new_ordering(conversation_id, "system"),
         "tags": ["error"],
     }
-    conversation_store.append_entry(conversation_id, entry)
+    conversation_store.append_entry(conversation_id, entry, owned=True)
 
 
 class TaskService:
@@ -116,13 +193,29 @@ class TaskService:
     def __init__(self, data_dir: Path, settings_path: Path) -> None:
         self.data_dir = data_dir
         self.settings_path = settings_path
-        self.task_queue: mp.Queue = mp.Queue()
-        self.event_queue: mp.Queue = mp.Queue()
-        self._counter = count()
+        # Tasks travel to the worker as JSON frames over a pipe; the worker
+        # orders them by (priority, order) on its own heap.
+        self._task_reader, self._task_writer = mp.Pipe(duplex=False)
+        # The worker only reads the pipe between tasks, so a full pipe would
+        # block whoever writes to it. Frames go through a writer thread instead,
+        # much like mp.Queue's feeder thread.
+        self._outgoing: queue.SimpleQueue[Optional[bytes]] = queue.SimpleQueue()
+        self._writer_thread: Optional[threading.Thread] = None
+        # Status events come back the same way, one JSON frame each.
+        self._event_reader, self._event_writer = mp.Pipe(duplex=False)
+        self._counter = 0
         self._process: Optional[mp.Process] = None
-        self._tasks: Dict[str, TaskRecord] = {}
+        # Queued and running tasks. Finished ones leave it as their event
+        # arrives: failures are dropped, the latest completions kept apart.
+        # Kept in least-recently-updated order so pruning needs no sort.
+        self._tasks: OrderedDict[str, TaskRecord] = OrderedDict()
+        self._completed: Deque[TaskRecord] = deque(maxlen=COMPLETED_TASKS_SHOWN)
         self._needs_summary: Set[str] = set()
-        self._lock = mp.Lock()
+        # Bumped whenever the tracked tasks change, so views can cache renders.
+        self.revision = 0
+        self._drain_deadline = 0.0
+        self._snapshot: List[TaskRecord] = []
+        self._snapshot_revision = -1
 
     def start(self) -> None:
         if self._process and self._process.is_alive():
@@ -131,8 +224,8 @@ class TaskService:
         self._process = mp.Process(
             target=_worker_main,
             args=(
-                self.task_queue,
-                self.event_queue,
+                self._task_reader,
+                self._event_writer,
                 str(self.data_dir),
                 str(self.settings_path),
             ),
@@ -155,6 +248,9 @@ class TaskService:
         if self._process.is_alive():
             self._process.terminate()
         self._process = None
+        if self._writer_thread is not None:
+            self._outgoing.put(None)
+            self._writer_thread = None
 
     def enqueue_completion(
         self,
@@ -201,7 +297,7 @@ class TaskService:
         agent: Optional[str] = None,
     ) -> str:
         self.start()
-        task_id = uuid4().hex
+        task_id = new_id()
         created = utcnow()
         record = TaskRecord(
             id=task_id,
@@ -214,14 +310,16 @@ class TaskService:
             agent=agent,
         )
         self._tasks[task_id] = record
-        order = next(self._counter)
+        self.revision += 1
+        self._counter += 1
+        order = self._counter
         queue_payload = {
             "task_id": task_id,
             "kind": kind,
             "conversation_id": conversation_id,
             "payload": payload,
         }
-        self.task_queue.put((priority, order, queue_payload))
+        self._send_frame(_encode_frame((priority, order, queue_payload)))
         logger.debug(
             "Enqueued task %s (kind=%s conversation=%s priority=%s)",
             task_id,
@@ -231,26 +329,56 @@ class TaskService:
         )
         return task_id
 
-    def mark_summary_needed(self, conversation_id: str) -> None:
-        self._needs_summary.add(conversation_id)
-
-    def pending_summary_ids(self) -> Set[str]:
-        return set(self._needs_summary)
+    def _send_frame(self, frame: bytes) -> None:
+        if self._writer_thread is None or not self._writer_thread.is_alive():
+            self._writer_thread = threading.Thread(
+                target=self._write_frames, name="task-writer", daemon=True
+            )
+            self._writer_thread.start()
+        self._outgoing.put(frame)
 
-    def drain_events(self) -> None:
-        processed = 0
+    def _write_frames(self) -> None:
         while True:
+            frame = self._outgoing.get()
+            if frame is None:
+                return
             try:
-                event = self.event_queue.get_nowait()
-            except queue.Empty:
-                break
-            processed += 1
-            task_id = event.get("task_id")
-            if task_id not in self._tasks:
+                self._task_writer.send_bytes(frame)
+            except OSError:
+                logger.exception("Could not hand a task to the worker.")
+                return
+
+    def mark_summary_needed(self, conversation_id: str) -> None:
+        self._needs_summary.add(conversation_id)
+
+    def take_pending_summary_ids(self) -> Set[str]:
+        """
+        Return the conversations awaiting a summary and start a fresh set,
+        handing the set over instead of copying it.
+        """
+        pending, self._needs_summary = self._needs_summary, set()
+        return pending
+
+    def drain_events(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now < self._drain_deadline:
+            return
+        self._drain_deadline = now + DRAIN_INTERVAL
+        changed = 0
+        received: Optional[str] = None
+        reader = self._event_reader
+        while reader.poll():
+            event = _loads(reader.recv_bytes())
+            record = self._tasks.get(event.get("task_id"))
+            if record is None:
+                # Bootstrap notices and tasks already pruned.
                 continue
-            record = self._tasks[task_id]
+            changed += 1
             status = event.get("status", record.status)
-            timestamp = event.get("timestamp", utcnow())
+            timestamp = event.get("timestamp")
+            if timestamp is None:
+                # Events always carry one; fall back to a single arrival time.
+                timestamp = received = received or utcnow()
             if status == "running" and record.started_at is None:
                 record.started_at = timestamp
             record.status = status
@@ -259,50 +387,38 @@ class TaskService:
             extra = event.get("data") or {}
             if extra.get("requires_summary") and record.conversation_id:
                 self.mark_summary_needed(record.conversation_id)
-        # Drop completed tasks after a while to keep the queue compact.
-        if processed:
-            self._trim_completed_tasks()
+            if status in ("completed", "failed"):
+                del self._tasks[record.id]
+                if status == "completed":
+                    self._completed.append(record)
+            else:
+                self._tasks.move_to_end(record.id)
+        # Only real changes invalidate the cached snapshot and rendered views.
+        if changed:
+            self.revision += 1
             self.prune(max_items=20)
 
     def prune(self, max_items: int) -> None:
-        if len(self._tasks) <= max_items:
-            return
-        # Retain newest tasks by updated_at.
-        ordered = sorted(
-            self._tasks.values(),
-            key=lambda record: record.updated_at,
-            reverse=True,
-        )
-        keep = {record.id for record in ordered[:max_items]}
-        self._tasks = {task_id: self._tasks[task_id] for task_id in keep}
+        # Retain the most recently updated tasks.
+        while len(self._tasks) > max_items:
+            self._tasks.popitem(last=False)
 
     def snapshot(self) -> List[TaskRecord]:
-        self._trim_completed_tasks()
-        return sorted(
-            self._tasks.values(),
-            key=lambda record: (
-                record.status == "completed",
-                record.priority,
-                record.updated_at,
-            ),
-        )
+        if self._snapshot_revision != self.revision:
+            self._snapshot = sorted(
+                [*self._tasks.values(), *self._completed],
+                key=lambda record: (
+                    record.status == "completed",
+                    record.priority,
+                    record.updated_at,
+                ),
+            )
+            self._snapshot_revision = self.revision
+        return list(self._snapshot)
 
     def worker_alive(self) -> bool:
         return self._process is not None and self._process.is_alive()
 
-    def _trim_completed_tasks(self) -> None:
-        failed_ids = [
-            task.id for task in self._tasks.values() if task.status == "failed"
-        ]
-        for task_id in failed_ids:
-            self._tasks.pop(task_id, None)
-        completed = [
-            task for task in self._tasks.values() if task.status == "completed"
-        ]
-        completed.sort(key=lambda record: record.updated_at, reverse=True)
-        for task in completed[2:]:
-            self._tasks.pop(task.id, None)
-
 
 class IdleMonitor:
     """
@@ -313,6 +429,8 @@ class IdleMonitor:
         self.timeout = timeout_seconds
         self._last_activity = time.monotonic()
         self._idle = False
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
 
     @property
     def idle(self) -> bool:
@@ -320,31 +438,54 @@ class IdleMonitor:
 
     def touch(self) -> None:
         self._last_activity = time.monotonic()
+        # Handlers may run on the threadpool, so wake the loop thread-safely.
+        if self._idle and self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
 
     async def loop(
         self,
         on_idle: Callable[[], None],
         on_active: Callable[[], None],
-        interval: float = 5.0,
+        idle_interval: float = 60.0,
     ) -> None:
+        """
+        Sleep until the idle deadline while active; once idle, wait for `touch`
+        (re-checking every `idle_interval` seconds).
+        """
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
         while True:
-            await asyncio.sleep(interval)
-            if time.monotonic() - self._last_activity > self.timeout:
-                if not self._idle:
-                    self._idle = True
-                    on_idle()
-            else:
-                if self._idle:
-                    self._idle = False
-                    on_active()
+            if self._idle:
+                # Clear before checking, so a touch in between is not lost.
+                self._wake.clear()
+                if time.monotonic() - self._last_activity > self.timeout:
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), idle_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                self._idle = False
+                on_active()
+                continue
+            remaining = self._last_activity + self.timeout - time.monotonic()
+            if remaining >= 0:
+                await asyncio.sleep(max(remaining, 0.1))
+                continue
+            self._idle = True
+            on_idle()
 
 
 def _worker_main(
-    task_queue: mp.Queue,
-    event_queue: mp.Queue,
+    task_reader: Connection,
+    event_writer: Connection,
     data_dir: str,
     settings_path: str,
 ) -> None:
+    # The llama.cpp client and tool registry are only used here, so the web
+    # process never imports them.
+    from .llm import LlamaCppClient, ToolRegistry, register_default_tools
+
+    outbox = _EventOutbox(event_writer)
     data_root = Path(data_dir)
     settings_manager = SettingsManager(Path(settings_path))
     conversation_store = ConversationStore(data_root)
@@ -362,7 +503,7 @@ def _worker_main(
             register_tools(registry)
         except Exception as err:  # pragma: no cover - user-defined
             _post_event(
-                event_queue,
+                outbox,
                 "bootstrap",
                 "failed",
                 f"Custom tool registration failed: {err}",
@@ -370,10 +511,13 @@ def _worker_main(
             logger.exception("Custom tool registration failed.")
 
     llama_client: Optional[LlamaCppClient] = None
+    config: Optional[WorkerConfig] = None
+    config_signature: Optional[Tuple[int, int, int]] = None
     logger.info("Worker online. Registered tools: %d", len(registry.definitions()))
 
+    pending: List[Tuple[int, int, Dict[str, Any]]] = []
     while True:
-        priority, _, payload = task_queue.get()
+        priority, _, payload = _next_task(task_reader, pending)
         kind = payload.get("kind")
         if kind == "shutdown":
             logger.info("Worker received shutdown signal.")
@@ -381,14 +525,21 @@ def _worker_main(
         task_id = payload.get("task_id")
         conversation_id = payload.get("conversation_id")
         task_payload = payload.get("payload") or {}
-        _post_event(event_queue, task_id, "running", "Task in progress.")
+        _post_event(outbox, task_id, "running", "Task in progress.")
         try:
-            settings = settings_manager.reload()
-            if llama_client is None or _settings_changed(llama_client, settings):
+            # Settings are re-read only when the web process has replaced the file.
+            signature = _file_signature(settings_manager.path)
+            if config is None or signature is None or signature != config_signature:
+                config = WorkerConfig.from_settings(settings_manager.reload())
+                config_signature = signature
+            if llama_client is None or _settings_changed(llama_client, config):
+                if llama_client is not None:
+                    llama_client.close()
                 llama_client = LlamaCppClient(
-                    base_url=settings["llama_cpp"]["base_url"],
-                    api_key=settings["llama_cpp"].get("api_key", ""),
+                    base_url=config.base_url,
+                    api_key=config.api_key,
                 )
+                llama_client.pre_warm()
                 logger.debug(
                     "Initialised llama.cpp client at %s",
                     llama_client.base_url,
@@ -406,7 +557,7 @@ def _worker_main(
                     conversation_id=conversation_id,
                     llama_client=llama_client,
                     registry=registry,
-                    settings=settings,
+                    config=config,
                     agent_name=task_payload.get("agent"),
                     model_override=task_payload.get("model"),
                     temperature_override=task_payload.get("temperature"),
@@ -422,7 +573,7 @@ def _worker_main(
             else:
                 raise ValueError(f"Unknown task type: {kind}")
             _post_event(
-                event_queue,
+                outbox,
                 task_id,
                 "completed",
                 "Task completed successfully.",
@@ -442,18 +593,39 @@ def _worker_main(
                 conversation_id,
             )
             _post_event(
-                event_queue,
+                outbox,
                 task_id,
                 "failed",
                 f"{type(exc).__name__}: {exc}",
             )
+    conversation_store.close()
+    outbox.close(timeout=5)
 
 
-def _settings_changed(client: LlamaCppClient, settings: Dict[str, Any]) -> bool:
-    return (
-        client.base_url != settings["llama_cpp"]["base_url"]
-        or client.api_key != settings["llama_cpp"].get("api_key", "")
-    )
+def _next_task(
+    task_reader: Connection,
+    pending: List[Tuple[int, int, Dict[str, Any]]],
+) -> Tuple[int, int, Dict[str, Any]]:
+    """
+    Move every frame waiting on the pipe onto the `pending` heap and pop the
+    most urgent task, blocking only while nothing is pending.
+    """
+    while not pending or task_reader.poll():
+        priority, order, payload = _loads(task_reader.recv_bytes())
+        heapq.heappush(pending, (priority, order, payload))
+    return heapq.heappop(pending)
+
+
+def _settings_changed(client: LlamaCppClient, config: WorkerConfig) -> bool:
+    return client.base_url != config.base_url or client.api_key != config.api_key
+
+
+def _file_signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
 
 
 def _build_message_history(
@@ -478,79 +650,61 @@ def _build_message_history(
             continue
         if etype == "message":
             messages.append(
-                {"role": entry["role"], "content": entry.get("content", "")}
+                {"role": entry["role"], "content": _message_text(entry.get("content"))}
             )
         elif etype == "completion":
-            content = entry.get("content") or {}
-            message = {
-                "role": entry.get("role", "assistant"),
-                "content": content.get("text") or "",
-            }
-            tool_calls = []
-            for call in content.get("tool_calls") or []:
-                tool_calls.append(
-                    {
-                        "id": call.get("id") or uuid4().hex,
-                        "type": "function",
-                        "function": {
-                            "name": call.get("name"),
-                            "arguments": json.dumps(call.get("arguments", {})),
-                        },
-                    }
-                )
-            if tool_calls:
-                message["tool_calls"] = tool_calls
-            messages.append(message)
+            messages.append(_completion_message(entry))
         elif etype == "tool_result":
-            content = entry.get("content") or {}
-            messages.append(
-                {
-                    "role": "tool",
-                    "tool_call_id": content.get("tool_call_id"),
-                    "name": content.get("tool"),
-                    "content": json.dumps(content.get("result", {})),
-                }
-            )
+            messages.append(_tool_result_message(entry))
     if system_prompt:
         messages.insert(0, {"role": "system", "content": system_prompt})
     return messages, system_prompt
 
 
-def _normalise_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    normalised: List[Dict[str, Any]] = []
-    for message in messages:
-        content = message.get("content", "")
-        if content is None:
-            content = ""
-        elif not isinstance(content, str):
-            try:
-                content = json.dumps(content, ensure_ascii=False)
-            except TypeError:
-                content = str(content)
-        message["content"] = content
+def _completion_message(entry: Dict[str, Any]) -> Dict[str, Any]:
+    content = entry.get("content") or {}
+    message = {
+        "role": entry.get("role", "assistant"),
+        "content": _message_text(content.get("text")),
+    }
+    tool_calls = []
+    for call in content.get("tool_calls") or []:
+        tool_calls.append(
+            {
+                "id": call.get("id") or new_id(),
+                "type": "function",
+                "function": {
+                    "name": call.get("name"),
+                    "arguments": _message_text(call.get("arguments"), "{}"),
+                },
+            }
+        )
+    if tool_calls:
+        message["tool_calls"] = tool_calls
+    return message
+
+
+def _tool_result_message(entry: Dict[str, Any]) -> Dict[str, Any]:
+    content = entry.get("content") or {}
+    name = content.get("tool")
+    return {
+        "role": "tool",
+        "tool_call_id": content.get("tool_call_id"),
+        "name": name if isinstance(name, str) else str(name),
+        "content": _json_text(content.get("result", {})),
+    }
 
-        tool_calls = message.get("tool_calls") or []
-        for call in tool_calls:
-            function = call.get("function") or {}
-            arguments = function.get("arguments")
-            if arguments is None:
-                function["arguments"] = "{}"
-            elif not isinstance(arguments, str):
-                try:
-                    function["arguments"] = json.dumps(arguments, ensure_ascii=False)
-                except TypeError:
-                    function["arguments"] = str(arguments)
-            call["function"] = function
-        if tool_calls:
-            message["tool_calls"] = tool_calls
-
-        if message.get("role") == "tool":
-            if not isinstance(message.get("name"), str):
-                message["name"] = str(message.get("name"))
-            if message.get("content") is None:
-                message["content"] = ""
-        normalised.append(message)
-    return normalised
+
+def _message_text(value: Any, empty: str = "") -> str:
+    # The chat API wants strings; structured values are sent as JSON text.
+    if value is None:
+        return empty
+    if isinstance(value, str):
+        return value
+    try:
+        return _json_text(value)
+    except TypeError:
+        return str(value)
 
 
 def _handle_completion(
@@ -558,24 +712,20 @@ def _handle_completion(
     conversation_id: str,
     llama_client: LlamaCppClient,
     registry: ToolRegistry,
-    settings: Dict[str, Any],
+    config: WorkerConfig,
     agent_name: Optional[str] = None,
     model_override: Optional[str] = None,
     temperature_override: Optional[float] = None,
     context_size_override: Optional[int] = None,
 ) -> Dict[str, Any]:
+    from .llm import LlamaCppError, unpack_assistant_message
+
     conversation = conversation_store.load_conversation(conversation_id)
     if not conversation:
         raise LlamaCppError("Conversation is empty.")
-    agent_settings = next(
-        (
-            agent
-            for agent in settings.get("agents", [])
-            if agent.get("name") == agent_name
-        ),
-        settings.get("agents", [{}])[0] if settings.get("agents") else {},
-    )
-    default_agent = settings.get("agents", [{}])[0] if settings.get("agents") else {}
+    agents_by_name = config.agents_by_name
+    default_agent = config.default_agent
+    agent_settings = agents_by_name.get(agent_name, default_agent)
     temperature = (
         temperature_override
         if temperature_override is not None
@@ -595,13 +745,10 @@ def _handle_completion(
     max_iterations = 4
     last_completion_id = None
     model_name = model_override
-    if not model_name and agent_name:
-        for agent in settings.get("agents", []):
-            if agent.get("name") == agent_name:
-                model_name = agent.get("model")
-                break
+    if not model_name and agent_name in agents_by_name:
+        model_name = agents_by_name[agent_name].get("model")
     if not model_name:
-        model_name = settings["llama_cpp"]["model"]
+        model_name = config.default_model
     logger.debug(
         "Invoking llama.cpp",
         extra={
@@ -610,19 +757,19 @@ def _handle_completion(
             "model": model_name,
         },
     )
+    _mark_trailing_completions_overridden(conversation_store, conversation_id, conversation)
+    # Built once; each round appends its completion and tool results.
+    messages, _ = _build_message_history(conversation, config.system_prompt)
+    if not messages or messages[-1]["role"] != "user":
+        error_message = "Cannot invoke completion without a trailing user prompt."
+        _append_error_entry(
+            conversation_store,
+            conversation_id,
+            error_message,
+            code="invalid_state",
+        )
+        raise LlamaCppError(error_message)
     while iterations < max_iterations:
-        _mark_trailing_completions_overridden(conversation_store, conversation_id, conversation)
-        messages, _ = _build_message_history(conversation, settings["system_prompt"])
-        messages = _normalise_messages(messages)
-        if not messages or messages[-1]["role"] != "user":
-            error_message = "Cannot invoke completion without a trailing user prompt."
-            _append_error_entry(
-                conversation_store,
-                conversation_id,
-                error_message,
-                code="invalid_state",
-            )
-            raise LlamaCppError(error_message)
         try:
             response = llama_client.chat(
                 model=model_name,
@@ -655,19 +802,21 @@ def _handle_completion(
         for call in tool_calls:
             func = call.get("function") or {}
             try:
-                arguments = json.loads(func.get("arguments") or "{}")
-            except json.JSONDecodeError:
+                arguments = _loads(func.get("arguments") or "{}")
+            except ValueError:
                 arguments = {"_raw": func.get("arguments")}
             formatted_calls.append(
                 {
-                    "id": call.get("id") or uuid4().hex,
+                    "id": call.get("id") or new_id(),
                     "name": func.get("name", ""),
                     "arguments": arguments,
                 }
             )
+        # One timestamp covers the completion and its tool results.
+        round_timestamp = utcnow()
         completion_entry = {
-            "id": uuid4().hex,
-            "timestamp": utcnow(),
+            "id": new_id(),
+            "timestamp": round_timestamp,
             "role": "assistant",
             "type": "completion",
             "content": {
@@ -681,34 +830,39 @@ def _handle_completion(
             "ordering": conversation_store.new_ordering(conversation_id, "receive"),
             "tags": [],
         }
-        conversation_store.append_entry(conversation_id, completion_entry)
-        conversation.append(completion_entry)
+        messages.append(_completion_message(completion_entry))
         last_completion_id = completion_entry["id"]
 
+        # The completion and its tool results are written together once the
+        # round is over, or as far as it got if a tool raises.
+        round_entries = [completion_entry]
+        try:
+            for call in formatted_calls:
+                name = call.get("name")
+                arguments = call.get("arguments") or {}
+                result = registry.execute(name, arguments)
+                serialised = _ensure_jsonable(result)
+                tool_entry = {
+                    "id": new_id(),
+                    "timestamp": round_timestamp,
+                    "role": "tool",
+                    "type": "tool_result",
+                    "content": {
+                        "tool": name,
+                        "tool_call_id": call.get("id"),
+                        "arguments": arguments,
+                        "result": serialised,
+                    },
+                    "ordering": conversation_store.new_ordering(conversation_id, "receive"),
+                    "tags": [],
+                }
+                round_entries.append(tool_entry)
+                messages.append(_tool_result_message(tool_entry))
+        finally:
+            conversation_store.append_entries(conversation_id, round_entries, owned=True)
+
         if not formatted_calls:
             break
-
-        for call in formatted_calls:
-            name = call.get("name")
-            arguments = call.get("arguments") or {}
-            result = registry.execute(name, arguments)
-            serialised = _ensure_jsonable(result)
-            tool_entry = {
-                "id": uuid4().hex,
-                "timestamp": utcnow(),
-                "role": "tool",
-                "type": "tool_result",
-                "content": {
-                    "tool": name,
-                    "tool_call_id": call.get("id"),
-                    "arguments": arguments,
-                    "result": serialised,
-                },
-                "ordering": conversation_store.new_ordering(conversation_id, "receive"),
-                "tags": [],
-            }
-            conversation_store.append_entry(conversation_id, tool_entry)
-            conversation.append(tool_entry)
         iterations += 1
 
     if iterations >= max_iterations:
@@ -754,14 +908,68 @@ def _handle_summarize(
     return {"summary": summary, "title": title}
 
 
+class _EventOutbox:
+    """
+    Worker-side buffer for status events, written to the pipe by a thread.
+
+    Only that thread blocks when the web process is slow to drain, never the
+    worker itself; this avoids polling the pipe for writability, which
+    Windows pipes do not support. Queued events for the same task collapse to
+    the latest one, which keeps the buffer bounded by the number of tasks
+    without ever losing a final status.
+    """
+
+    def __init__(self, writer: Connection) -> None:
+        self._writer = writer
+        self._queued: OrderedDict[Optional[str], Dict[str, Any]] = OrderedDict()
+        self._ready = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._send_events, name="event-writer", daemon=True
+        )
+        self._thread.start()
+
+    def __len__(self) -> int:
+        with self._ready:
+            return len(self._queued)
+
+    def post(self, event: Dict[str, Any]) -> None:
+        task_id = event.get("task_id")
+        with self._ready:
+            self._queued.pop(task_id, None)
+            self._queued[task_id] = event
+            self._ready.notify()
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Send whatever is still queued, then stop the writer thread."""
+        with self._ready:
+            self._closed = True
+            self._ready.notify()
+        self._thread.join(timeout)
+
+    def _send_events(self) -> None:
+        while True:
+            with self._ready:
+                while not self._queued and not self._closed:
+                    self._ready.wait()
+                if not self._queued:
+                    return
+                _, event = self._queued.popitem(last=False)
+            try:
+                self._writer.send_bytes(_encode_frame(event))
+            except OSError:
+                logger.warning("Event pipe closed; dropping queued events.")
+                return
+
+
 def _post_event(
-    queue: mp.Queue,
+    outbox: _EventOutbox,
     task_id: str,
     status: str,
     message: str,
     data: Optional[Dict[str, Any]] = None,
 ) -> None:
-    queue.put(
+    outbox.post(
         {
             "task_id": task_id,
             "status": status,
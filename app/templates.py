@@ -2,80 +2,41 @@ from __future__ import annotations
 
 import json
 from datetime import datetime, timezone
+from functools import lru_cache
 from html import escape
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 from .tasks import TaskRecord
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore[assignment]
 
-def render_dashboard(
-    *,
-    conversations: List[Dict],
-    active_conversation: Optional[str],
-    conversation_entries: List[Dict],
-    entry_ids: List[str],
-    reward_map: Dict[str, int],
-    tool_reward_map: Dict[str, int],
-    conversation_title: str,
-    agents: List[Dict],
-    tasks: List[TaskRecord],
-    status: Dict[str, str],
-    task_signature: List[List[str]],
-) -> str:
-    agent_names = [agent.get("alias", "") for agent in agents if agent.get("alias")]
-    agents_json = escape(json.dumps(agent_names))
-    history_html = render_conversation_list(conversations, active_conversation)
-    messages_html = render_conversation_messages(
-        conversation_entries,
-        reward_map,
-        tool_reward_map,
-        active_conversation,
-    )
-    completed = [task for task in tasks if task.status == "completed"]
-    queued = [task for task in tasks if task.status != "completed"]
-    completed.sort(key=lambda record: record.updated_at, reverse=True)
-    completed = completed[:2]
-    queued.sort(key=lambda record: (record.priority, record.updated_at))
-    completed_placeholder = "<article class=\"task-card placeholder\"><p>No finished tasks.</p></article>"
-    queued_placeholder = "<article class=\"task-card placeholder\"><p>No queued tasks.</p></article>"
-
-    completed_html = render_task_strip(
-        completed,
-        css_class="completed",
-        min_slots=2,
-        placeholder_html=completed_placeholder,
-    )
-    queued_html = render_task_strip(
-        queued,
-        css_class="queued",
-        min_slots=1,
-        placeholder_html=queued_placeholder,
-    )
 
-    task_sections: List[str] = []
-    if completed_html:
-        task_sections.append(completed_html)
-    if completed_html and queued_html:
-        task_sections.append("<div class=\"task-divider\"></div>")
-    if queued_html:
-        task_sections.append(queued_html)
-    tasks_html = "\n".join(task_sections)
-    scripts = _refresh_script()
-    active_attr = escape(active_conversation or "")
-    title_html = escape(conversation_title or "Conversation")
-    entry_ids_json = escape(json.dumps(entry_ids))
-    last_entry_id = escape(entry_ids[-1] if entry_ids else "")
-    task_signature_json = escape(json.dumps(task_signature))
+def _json_compact(value: Any) -> str:
+    # Same shape as the browser's JSON.stringify, so the task signature the
+    # page embeds compares equal to the one the refresh script builds.
+    if orjson is not None:
+        try:
+            return orjson.dumps(value).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
 
-    prompt_html = render_prompt_form(active_conversation, agents)
 
-    return f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-  <meta charset="utf-8" />
-  <title>Minimal LLM WebUI</title>
-  <style>
-    :root {{
+def _json_pretty(value: Any) -> str:
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=str, option=orjson.OPT_INDENT_2).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(value, indent=2, ensure_ascii=False, default=str)
+
+
+# Static dashboard styles, kept out of the page f-string so braces need no escaping.
+_DASHBOARD_CSS = """
+    :root {
       color-scheme: light dark;
       --bg: #f5f5f5;
       --border: #ccc;
@@ -84,11 +45,11 @@ def render_dashboard(
       --muted: #666;
       --queue-bg: #f0f4fb;
       font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", sans-serif;
-    }}
-    [hidden] {{
+    }
+    [hidden] {
       display: none !important;
-    }}
-    body {{
+    }
+    body {
       margin: 0;
       background: var(--bg);
       color: #111;
@@ -97,8 +58,8 @@ def render_dashboard(
       flex-direction: column;
       padding: 0.4rem;
       box-sizing: border-box;
-    }}
-    main {{
+    }
+    main {
       flex: 1;
       min-height: 0;
       display: grid;
@@ -111,17 +72,17 @@ def render_dashboard(
       padding: 0.5rem;
       box-sizing: border-box;
       overflow: hidden;
-    }}
-    main > * {{
+    }
+    main > * {
       min-height: 0;
-    }}
-    .status-badges {{
+    }
+    .status-badges {
       display: flex;
       gap: 0.35rem;
       align-items: center;
       flex-wrap: wrap;
-    }}
-    .help-button {{
+    }
+    .help-button {
       display: inline-flex;
       align-items: center;
       gap: 0.3rem;
@@ -134,8 +95,8 @@ def render_dashboard(
       font-size: 0.75rem;
       text-transform: uppercase;
       letter-spacing: 0.05em;
-    }}
-    .settings-button {{
+    }
+    .settings-button {
       display: inline-flex;
       align-items: center;
       padding: 0.25rem 0.5rem;
@@ -147,24 +108,24 @@ def render_dashboard(
       text-transform: uppercase;
       letter-spacing: 0.05em;
       text-decoration: none;
-    }}
-    .badge {{
+    }
+    .badge {
       padding: 0.12rem 0.45rem;
       border-radius: 999px;
       background: var(--border);
       font-size: 0.7rem;
       text-transform: uppercase;
       letter-spacing: 0.05em;
-    }}
-    .badge[data-state="ok"] {{
+    }
+    .badge[data-state="ok"] {
       background: #d9f0ff;
       color: #004b91;
-    }}
-    .badge[data-state="warn"] {{
+    }
+    .badge[data-state="warn"] {
       background: #ffe8d6;
       color: #a55300;
-    }}
-    nav {{
+    }
+    nav {
       grid-area: history;
       background: var(--panel-bg);
       border: 1px solid var(--border);
@@ -173,20 +134,20 @@ def render_dashboard(
       flex-direction: column;
       overflow: hidden;
       min-height: 0;
-    }}
-    nav h2 {{
+    }
+    nav h2 {
       font-size: 0.9rem;
       padding: 0.5rem 0.6rem 0.2rem;
       margin: 0;
-    }}
-    nav .conversations {{
+    }
+    nav .conversations {
       overflow-y: auto;
       padding: 0 0.35rem 0.35rem 0.55rem;
       flex: 1;
       margin-right: -0.3rem;
       padding-right: 0.5rem;
-    }}
-    nav a {{
+    }
+    nav a {
       display: block;
       padding: 0.4rem 0.55rem;
       margin-bottom: 0.2rem;
@@ -195,36 +156,36 @@ def render_dashboard(
       color: inherit;
       background: transparent;
       border: 1px solid transparent;
-    }}
-    nav a strong {{
+    }
+    nav a strong {
       display: block;
       font-size: 0.85rem;
-    }}
-    nav a span {{
+    }
+    nav a span {
       display: block;
       font-size: 0.7rem;
       color: var(--muted);
       margin-top: 0.15rem;
-    }}
-    nav a.active {{
+    }
+    nav a.active {
       background: #e7f0ff;
       border-color: #c5d7ff;
       color: #123e90;
-    }}
-    nav form {{
+    }
+    nav form {
       padding: 0.45rem 0.6rem 0.6rem;
       border-top: 1px solid var(--border);
       background: rgba(0,0,0,0.02);
-    }}
-    nav button {{
+    }
+    nav button {
       width: 100%;
       padding: 0.35rem 0.45rem;
       border-radius: 6px;
       border: 1px solid var(--border);
       background: #f2f4f8;
       cursor: pointer;
-    }}
-    section.chat {{
+    }
+    section.chat {
       grid-area: chat;
       display: flex;
       flex-direction: column;
@@ -234,21 +195,21 @@ def render_dashboard(
       overflow: hidden;
       min-height: 0;
       position: relative;
-    }}
-    .chat-header {{
+    }
+    .chat-header {
       display: flex;
       justify-content: space-between;
       align-items: center;
       padding: 0.55rem 0.75rem;
       background: rgba(0,0,0,0.02);
       border-bottom: 1px solid var(--border);
-    }}
-    .chat-header h2 {{
+    }
+    .chat-header h2 {
       margin: 0;
       font-size: 1rem;
       font-weight: 600;
-    }}
-    .history {{
+    }
+    .history {
       flex: 1;
       min-height: 0;
       overflow-y: auto;
@@ -256,30 +217,30 @@ def render_dashboard(
       display: flex;
       flex-direction: column;
       gap: 0.55rem;
-    }}
-    .message {{
+    }
+    .message {
       border: 1px solid var(--border);
       border-radius: 6px;
       padding: 0.45rem 0.65rem;
       background: #fafafa;
-    }}
-    .message.user {{
+    }
+    .message.user {
       border-color: #c8d1ff;
       background: #f1f4ff;
-    }}
-    .message.assistant {{
+    }
+    .message.assistant {
       border-color: #c2e0ff;
       background: #eef7ff;
-    }}
-    .message.tool {{
+    }
+    .message.tool {
       border-color: #e2d4ff;
       background: #f5efff;
-    }}
-    .message.error {{
+    }
+    .message.error {
       border-color: #f28b82;
       background: #fdecea;
-    }}
-    .message-header {{
+    }
+    .message-header {
       display: flex;
       justify-content: space-between;
       align-items: flex-start;
@@ -287,89 +248,89 @@ def render_dashboard(
       margin-bottom: 0.35rem;
       font-size: 0.82rem;
       color: var(--muted);
-    }}
-    .message-meta {{
+    }
+    .message-meta {
       flex: 1 1 auto;
       word-break: break-word;
-    }}
-    .message-actions {{
+    }
+    .message-actions {
       flex: 0 0 auto;
       display: flex;
       gap: 0.25rem;
       flex-wrap: wrap;
       justify-content: flex-end;
-    }}
-    .message-actions form {{
+    }
+    .message-actions form {
       display: flex;
       gap: 0.25rem;
       flex-wrap: wrap;
-    }}
-    .message-actions .label-actions {{
+    }
+    .message-actions .label-actions {
       margin: 0;
-    }}
-    .message-tags {{
+    }
+    .message-tags {
       display: inline-flex;
       gap: 0.35rem;
       margin-left: 0.35rem;
       align-items: center;
       flex-wrap: wrap;
-    }}
-    .message-tag {{
+    }
+    .message-tag {
       font-size: 0.65rem;
       padding: 0.15rem 0.35rem;
       border-radius: 999px;
       background: rgba(17, 24, 39, 0.08);
       text-transform: uppercase;
       letter-spacing: 0.05em;
-    }}
-    .message.error .message-tag {{
+    }
+    .message.error .message-tag {
       background: rgba(220, 38, 38, 0.14);
       color: #9b1c1c;
-    }}
-    .label-actions {{
+    }
+    .label-actions {
       display: flex;
       gap: 0.25rem;
-    }}
-    .label-actions button {{
+    }
+    .label-actions button {
       font-size: 0.72rem;
       padding: 0.2rem 0.45rem;
       border-radius: 999px;
       border: 1px solid var(--border);
       background: #fff;
       cursor: pointer;
-    }}
-    .label-actions button.selected {{
+    }
+    .label-actions button.selected {
       background: #d6f5d6;
       border-color: #36a536;
       font-weight: 600;
-    }}
-    .message-body {{
+    }
+    .message-body {
       display: flex;
       flex-direction: column;
       gap: 0.45rem;
-    }}
-    .message-body pre {{
+    }
+    .message-body pre {
       margin: 0;
       white-space: pre-wrap;
       font-family: "SFMono-Regular", Consolas, "Liberation Mono", monospace;
       background: rgba(0, 0, 0, 0.03);
       padding: 0.5rem;
       border-radius: 4px;
-    }}
-    .message-body details {{
+    }
+    .message-body details {
       border: 1px dashed var(--border);
       border-radius: 4px;
       padding: 0.35rem 0.5rem;
       background: rgba(0,0,0,0.02);
-    }}
-    .error-banner {{
+    }
+    .error-banner {
       padding: 0.45rem 0.55rem;
       border-left: 3px solid #d14343;
       background: rgba(209, 67, 67, 0.1);
       border-radius: 6px;
       color: #7f1d1d;
-    }}
-    .reasoning-toggle {{
+    }
+    .reasoning-toggle {
       padding: 0.2rem 0.55rem;
       border-radius: 999px;
       border: 1px solid var(--accent);
@@ -378,37 +339,37 @@ def render_dashboard(
       font-size: 0.7rem;
       cursor: pointer;
       transition: background 0.2s ease;
-    }}
-    .reasoning-toggle[aria-expanded="true"] {{
+    }
+    .reasoning-toggle[aria-expanded="true"] {
       background: var(--accent);
       color: #fff;
-    }}
-    .reasoning-details {{
+    }
+    .reasoning-details {
       border: 1px solid rgba(51, 103, 214, 0.35);
       background: rgba(51, 103, 214, 0.05);
       padding: 0.35rem 0.45rem 0.45rem;
-    }}
-    .reasoning-details summary {{
+    }
+    .reasoning-details summary {
       font-size: 0.72rem;
       font-weight: 600;
       color: #123e90;
       cursor: pointer;
-    }}
-    .reasoning-details summary::-webkit-details-marker {{
+    }
+    .reasoning-details summary::-webkit-details-marker {
       display: none;
-    }}
-    .reasoning-content {{
+    }
+    .reasoning-content {
       margin-top: 0.35rem;
       display: flex;
       flex-direction: column;
       gap: 0.35rem;
-    }}
-    .reasoning-content pre {{
+    }
+    .reasoning-content pre {
       margin: 0;
       padding: 0.35rem;
       background: rgba(10, 40, 120, 0.08);
-    }}
-    .sr-only {{
+    }
+    .sr-only {
       position: absolute;
       width: 1px;
       height: 1px;
@@ -418,30 +379,30 @@ def render_dashboard(
       clip: rect(0, 0, 0, 0);
       white-space: nowrap;
       border: 0;
-    }}
-    .reasoning {{
+    }
+    .reasoning {
       margin-top: 0.35rem;
       padding: 0.45rem 0.55rem;
       border-left: 3px solid rgba(51, 103, 214, 0.35);
       background: rgba(51, 103, 214, 0.06);
       border-radius: 6px;
       display: none;
-    }}
-    .reasoning.visible {{
+    }
+    .reasoning.visible {
       display: block;
-    }}
-    .prompt-container {{
+    }
+    .prompt-container {
       border-top: 1px solid var(--border);
       background: #f7f9ff;
       padding: 0.6rem 0.7rem 0.55rem;
       position: relative;
-    }}
-    form.prompt {{
+    }
+    form.prompt {
       display: flex;
       flex-direction: column;
       gap: 0.5rem;
-    }}
-    form.prompt textarea {{
+    }
+    form.prompt textarea {
       resize: vertical;
       min-height: 72px;
       padding: 0.5rem;
@@ -450,20 +411,20 @@ def render_dashboard(
       font-size: 0.95rem;
       font-family: inherit;
       transition: border-color 0.2s ease, box-shadow 0.2s ease;
-    }}
-    .prompt-container.mention-visible textarea {{
+    }
+    .prompt-container.mention-visible textarea {
       border-color: var(--accent);
       box-shadow: 0 0 0 2px rgba(51, 103, 214, 0.2);
-    }}
-    .prompt-row {{
+    }
+    .prompt-row {
       display: flex;
       gap: 0.45rem;
       align-items: stretch;
-    }}
-    .prompt-row textarea {{
+    }
+    .prompt-row textarea {
       flex: 1 1 auto;
-    }}
-    .prompt-row button {{
+    }
+    .prompt-row button {
       padding: 0.45rem 0.9rem;
       border-radius: 6px;
       border: 1px solid var(--accent);
@@ -471,20 +432,20 @@ def render_dashboard(
       color: #fff;
       cursor: pointer;
       min-width: 72px;
-    }}
-    .agent-card h3 {{
+    }
+    .agent-card h3 {
       margin: 0 0 0.4rem;
       font-size: 0.9rem;
-    }}
-    aside button {{
+    }
+    aside button {
       padding: 0.35rem 0.55rem;
       border-radius: 6px;
       border: 1px solid var(--accent);
       background: var(--accent);
       color: #fff;
       cursor: pointer;
-    }}
-    section.queue {{
+    }
+    section.queue {
       grid-area: queue;
       background: var(--queue-bg);
       border: 1px solid var(--border);
@@ -494,57 +455,57 @@ def render_dashboard(
       display: flex;
       flex-direction: column;
       min-height: 0;
-    }}
-    .queue-header {{
+    }
+    .queue-header {
       display: flex;
       justify-content: space-between;
       align-items: center;
       margin-bottom: 0.4rem;
-    }}
-    .queue-header h2 {{
+    }
+    .queue-header h2 {
       margin: 0;
       font-size: 0.9rem;
-    }}
-    .queue-header small {{
+    }
+    .queue-header small {
       color: var(--muted);
       font-size: 0.7rem;
-    }}
-    .queue-title {{
+    }
+    .queue-title {
       display: flex;
       flex-direction: row;
       align-items: center;
       gap: 0.4rem;
-    }}
-    .queue-title h2 {{
+    }
+    .queue-title h2 {
       margin: 0;
       font-size: 0.9rem;
-    }}
-    .queue-actions {{
+    }
+    .queue-actions {
       display: flex;
       gap: 0.35rem;
       align-items: center;
-    }}
-    .task-area {{
+    }
+    .task-area {
       display: flex;
       flex-direction: row;
       gap: 0.3rem;
       align-items: stretch;
       overflow-x: auto;
       padding-bottom: 0.2rem;
-    }}
-    .task-lane {{
+    }
+    .task-lane {
       display: flex;
       flex: 0 0 auto;
       align-items: stretch;
-    }}
-    .task-lane.completed {{
+    }
+    .task-lane.completed {
       opacity: 0.9;
-    }}
-    .task-lane.queued {{
+    }
+    .task-lane.queued {
       flex: 1 1 auto;
       min-width: 0;
-    }}
-    .task-strip {{
+    }
+    .task-strip {
       display: flex;
       flex-direction: row;
       gap: 0.35rem;
@@ -554,29 +515,29 @@ def render_dashboard(
       height: 100%;
       align-items: center;
       justify-content: flex-start;
-    }}
-    .task-lane.completed .task-strip {{
+    }
+    .task-lane.completed .task-strip {
       flex: 0 0 auto;
       width: auto;
       max-width: calc(160px * 2 + 0.7rem);
-    }}
-    .task-lane.completed.empty {{
+    }
+    .task-lane.completed.empty {
       flex: 0 0 calc(160px * 2 + 0.7rem);
       max-width: calc(160px * 2 + 0.7rem);
-    }}
-    .task-lane.queued.empty {{
+    }
+    .task-lane.queued.empty {
       flex: 1 1 auto;
       min-width: 0;
-    }}
-    .task-lane.empty .task-strip {{
+    }
+    .task-lane.empty .task-strip {
       justify-content: flex-start;
       max-width: 100%;
       width: 100%;
-    }}
-    .task-lane.queued .task-strip {{
+    }
+    .task-lane.queued .task-strip {
       justify-content: flex-start;
-    }}
-    .task-divider {{
+    }
+    .task-divider {
       flex: 0 0 4px;
       background: linear-gradient(
         180deg,
@@ -586,8 +547,8 @@ def render_dashboard(
       );
       border-radius: 6px;
       align-self: stretch;
-    }}
-    .task-card {{
+    }
+    .task-card {
       flex: 0 0 160px;
       max-width: 160px;
       border: 1px solid var(--border);
@@ -605,50 +566,50 @@ def render_dashboard(
       margin: 0;
       overflow: hidden;
       box-sizing: border-box;
-    }}
-    .task-card.high {{
+    }
+    .task-card.high {
       border-color: #d64545;
-    }}
-    .task-card.low {{
+    }
+    .task-card.low {
       border-color: #8aa6d6;
-    }}
-    .task-card.running {{
+    }
+    .task-card.running {
       border-color: #36a536;
-    }}
-    .task-card .task-info {{
+    }
+    .task-card .task-info {
       display: flex;
       flex-direction: column;
       gap: 0.25rem;
       min-height: 0;
-    }}
-    .task-line {{
+    }
+    .task-line {
       margin: 0;
       font-size: 0.7rem;
       line-height: 1.2;
       white-space: nowrap;
       overflow: hidden;
       text-overflow: ellipsis;
-    }}
-    .task-line--title {{
+    }
+    .task-line--title {
       font-weight: 600;
       color: #202945;
       font-size: 0.74rem;
-    }}
-    .task-line--status {{
+    }
+    .task-line--status {
       color: var(--muted);
-    }}
-    .task-line--agent {{
+    }
+    .task-line--agent {
       color: #1f2a44;
-    }}
-    .task-lane.empty .task-card.placeholder {{
+    }
+    .task-lane.empty .task-card.placeholder {
       align-items: center;
       justify-content: center;
       text-align: center;
       border-style: dashed;
       background: rgba(51, 103, 214, 0.08);
       color: var(--muted);
-    }}
-    .task-card.placeholder {{
+    }
+    .task-card.placeholder {
       flex: 0 0 160px;
       max-width: 160px;
       min-height: 98px;
@@ -656,16 +617,16 @@ def render_dashboard(
       align-items: center;
       justify-content: center;
       gap: 0;
-    }}
-    .task-card.placeholder p {{
+    }
+    .task-card.placeholder p {
       margin: 0;
       font-size: 0.74rem;
       width: 100%;
       white-space: nowrap;
       overflow: hidden;
       text-overflow: ellipsis;
-    }}
-    .task-action {{
+    }
+    .task-action {
       margin-top: auto;
       display: inline-flex;
       align-items: center;
@@ -678,20 +639,20 @@ def render_dashboard(
       color: #123e90;
       text-decoration: none;
       transition: background 0.15s ease;
-    }}
-    .task-action:hover {{
+    }
+    .task-action:hover {
       background: var(--accent);
       color: #fff;
-    }}
-    .task-details {{
+    }
+    .task-details {
       margin-top: 0.2rem;
-    }}
-    .task-details summary {{
+    }
+    .task-details summary {
       cursor: pointer;
       font-size: 0.7rem;
       color: var(--accent);
-    }}
-    .task-details pre {{
+    }
+    .task-details pre {
       background: rgba(15, 23, 42, 0.04);
       padding: 0.4rem;
       border-radius: 6px;
@@ -699,19 +660,19 @@ def render_dashboard(
       font-size: 0.7rem;
       max-height: 160px;
       margin: 0.3rem 0 0;
-    }}
-    }}
-    .placeholder {{
+    }
+    }
+    .placeholder {
       color: var(--muted);
       margin: auto;
       padding: 1rem;
       text-align: center;
-    }}
-    .empty {{
+    }
+    .empty {
       color: var(--muted);
       padding: 0.5rem 0;
-    }}
-    .mention-helper {{
+    }
+    .mention-helper {
       position: absolute;
       z-index: 20;
       max-height: 140px;
@@ -725,8 +686,8 @@ def render_dashboard(
       display: flex;
       flex-direction: column;
       gap: 0.2rem;
-    }}
-    .mention-helper button {{
+    }
+    .mention-helper button {
       text-align: left;
       border: none;
       background: transparent;
@@ -734,32 +695,48 @@ def render_dashboard(
       border-radius: 4px;
       cursor: pointer;
       font-size: 0.8rem;
-    }}
+    }
     .mention-helper button:hover,
-    .mention-helper button:focus {{
+    .mention-helper button:focus {
       background: #eef3ff;
-    }}
-    .mention-helper button.active {{
+    }
+    .mention-helper button.active {
       background: rgba(51, 103, 214, 0.15);
       font-weight: 600;
-    }}
-    .task-card.completed {{
+    }
+    .task-card.completed {
       background: #e9f7ec;
       border-color: #6fbe7c;
       opacity: 0.8;
-    }}
-    .task-card.failed {{
+    }
+    .task-card.failed {
       background: #fdecea;
       border-color: #f28b82;
-    }}
+    }
+""".strip("\n")
+
+
+_DASHBOARD_HEAD = f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="utf-8" />
+  <title>Minimal LLM WebUI</title>
+  <style>
+{_DASHBOARD_CSS}
   </style>
 </head>
 <body>
-  <main id="layout" data-active-conversation="{active_attr}" data-agents='{agents_json}'>
+"""
+
+
+# The dashboard frame around the cached fragments, filled with format_map.
+_DASHBOARD_NAV = """  <main id="layout" data-active-conversation="{active_attr}" data-agents='{agents_json}'>
     <nav>
       <h2>Conversations</h2>
       <div class="conversations" id="conversation-list">
-        {history_html}
+        """
+
+_DASHBOARD_CHAT = """
       </div>
       <form method="post" action="/conversation/new">
         <button type="submit">Start new conversation</button>
@@ -770,7 +747,9 @@ def render_dashboard(
         <h2 id="conversation-title">{title_html}</h2>
       </header>
       <div class="history" id="conversation-history" data-entry-ids='{entry_ids_json}' data-last-entry-id="{last_entry_id}">
-        {messages_html}
+        """
+
+_DASHBOARD_QUEUE = """
       </div>
       <div class="prompt-container">
         {prompt_html}
@@ -781,9 +760,9 @@ def render_dashboard(
         <div class="queue-title">
           <h2>Priority Queue</h2>
           <div class="status-badges">
-            <div class="badge" id="worker-badge" data-state="{escape(status.get('worker_state', 'warn'))}">Worker {escape(status.get('worker_label', 'offline'))}</div>
-              <div class="badge" id="idle-badge" data-state="{escape(status.get('idle_state', 'ok'))}">{escape(status.get('idle_label', 'Active'))}</div>
-              <div class="badge" id="llama-badge" data-state="{escape(status.get('llama_state', 'warn'))}">{escape(status.get('llama_label', 'LLM Unknown'))}</div>
+            <div class="badge" id="worker-badge" data-state="{worker_state}">Worker {worker_label}</div>
+              <div class="badge" id="idle-badge" data-state="{idle_state}">{idle_label}</div>
+              <div class="badge" id="llama-badge" data-state="{llama_state}">{llama_label}</div>
             </div>
           </div>
         <div class="queue-actions">
@@ -792,12 +771,68 @@ def render_dashboard(
         </div>
       </div>
       <div class="task-area" id="task-strip" data-task-signature='{task_signature_json}'>
-        {tasks_html}
+        """
+
+
+def iter_dashboard(
+    *,
+    history_html: str,
+    messages_html: str,
+    tasks_html: str,
+    active_conversation: Optional[str],
+    entry_ids: List[str],
+    conversation_title: str,
+    agents: List[Dict],
+    status: Dict[str, str],
+    task_signature: List[List[str]],
+) -> Iterator[str]:
+    """
+    Yield the dashboard page in chunks around already rendered sidebar, message
+    and task fragments, which the caller caches between requests.
+
+    The fragments are passed through as they are rather than formatted into
+    the page template, so the caller copies them only when joining the page.
+    """
+    yield _DASHBOARD_HEAD
+    agent_names = [agent.get("alias", "") for agent in agents if agent.get("alias")]
+    agents_json = escape(_json_compact(agent_names))
+    active_attr = escape(active_conversation or "")
+    yield _DASHBOARD_NAV.format_map(
+        {"active_attr": active_attr, "agents_json": agents_json}
+    )
+    yield history_html
+    title_html = escape(conversation_title or "Conversation")
+    entry_ids_json = escape(_json_compact(entry_ids))
+    last_entry_id = escape(entry_ids[-1] if entry_ids else "")
+    yield _DASHBOARD_CHAT.format_map(
+        {
+            "title_html": title_html,
+            "entry_ids_json": entry_ids_json,
+            "last_entry_id": last_entry_id,
+        }
+    )
+    yield messages_html
+    prompt_html = render_prompt_form(active_conversation, agents)
+    task_signature_json = escape(_json_compact(task_signature))
+    yield _DASHBOARD_QUEUE.format_map(
+        {
+            "prompt_html": prompt_html,
+            "task_signature_json": task_signature_json,
+            "worker_state": escape(status.get("worker_state", "warn")),
+            "worker_label": escape(status.get("worker_label", "offline")),
+            "idle_state": escape(status.get("idle_state", "ok")),
+            "idle_label": escape(status.get("idle_label", "Active")),
+            "llama_state": escape(status.get("llama_state", "warn")),
+            "llama_label": escape(status.get("llama_label", "LLM Unknown")),
+        }
+    )
+    yield tasks_html
+    yield f"""
       </div>
     </section>
   </main>
   <noscript><div class="placeholder">JavaScript disabled – refresh the page to see new messages.</div></noscript>
-  {scripts}
+  {_refresh_script()}
 </body>
 </html>"""
 
@@ -859,9 +894,11 @@ def render_task_strip(
 def _format_entry_content(value: Any) -> str:
     if isinstance(value, (dict, list)):
         try:
-            return json.dumps(value, indent=2, ensure_ascii=False, default=str)
+            return _json_pretty(value)
         except TypeError:
-            return json.dumps(json.loads(json.dumps(value, default=str)), indent=2)
+            # default=str already covers unknown values; this is left for
+            # keys JSON cannot represent.
+            return str(value)
     return str(value)
 
 
@@ -881,7 +918,7 @@ def _normalise_reasoning(value: Any) -> List[str]:
                 if key in item:
                     _append(item[key])
                     return
-            parts.append(json.dumps(item, ensure_ascii=False))
+            parts.append(_json_compact(item))
             return
         if isinstance(item, list):
             for sub in item:
@@ -895,13 +932,22 @@ def _normalise_reasoning(value: Any) -> List[str]:
 
 def _render_history_item(item: Dict, active_conversation: Optional[str]) -> str:
     conversation_id = item["conversation_id"]
-    title = escape(item.get("title") or item.get("summary") or conversation_id[:8])
+    return _history_item_html(
+        conversation_id,
+        item.get("title") or item.get("summary") or conversation_id[:8],
+        item.get("last_accessed", ""),
+        conversation_id == active_conversation,
+    )
+
+
+@lru_cache(maxsize=4096)
+def _history_item_html(conversation_id: str, title: str, timestamp: str, active: bool) -> str:
+    # Sidebar rows rarely change between polls, so identical rows are reused.
     url = f"/?conversation={conversation_id}"
-    classes = "active" if conversation_id == active_conversation else ""
-    timestamp = escape(item.get("last_accessed", ""))
+    classes = "active" if active else ""
     return (
-        f'<a class="{classes}" href="{url}"><strong>{title}</strong>'
-        f"<span>{timestamp}</span></a>"
+        f'<a class="{classes}" href="{url}"><strong>{escape(title)}</strong>'
+        f"<span>{escape(timestamp)}</span></a>"
     )
 
 
@@ -983,13 +1029,13 @@ def _render_entry(
         body_parts.append(f"<div class=\"error-banner\"><strong>{code_label}</strong>: {message}</div>")
         if detail is not None:
             try:
-                detail_json = json.dumps(detail, indent=2, default=str)
+                detail_json = _json_pretty(detail)
             except TypeError:
                 detail_json = str(detail)
             body_parts.append(f"<pre>{escape(detail_json)}</pre>")
     elif etype == "tool_result":
         content = entry.get("content") or {}
-        result = escape(json.dumps(content.get("result"), indent=2, default=str))
+        result = escape(_json_pretty(content.get("result")))
         body_parts.append(
             f"<details><summary>Tool Result · {escape(content.get('tool', ''))}</summary>"
             f"<pre>{result}</pre></details>"
@@ -1001,19 +1047,26 @@ def _render_entry(
     if "error" in tags or etype == "error":
         classes += " error"
     entry_attr = f' data-entry-id="{escape(entry_id)}"' if entry_id else ""
-    header_html = (
-        f'<header class="message-header"><span class="message-meta">{escape(header_text)}</span>'
-    )
+    # Collected and joined once rather than grown with repeated +=.
+    parts = [
+        f'<article class="{classes}"{entry_attr}>',
+        f'<header class="message-header"><span class="message-meta">{escape(header_text)}</span>',
+    ]
     if tags:
-        tag_html = "".join(f"<span class=\"message-tag\">{escape(str(tag))}</span>" for tag in tags)
-        header_html += f"<span class=\"message-tags\">{tag_html}</span>"
+        parts.append("<span class=\"message-tags\">")
+        parts.extend(f"<span class=\"message-tag\">{escape(str(tag))}</span>" for tag in tags)
+        parts.append("</span>")
     if actions:
-        header_html += f"<div class=\"message-actions\">{''.join(actions)}</div>"
-    header_html += "</header>"
-    body_html = ""
+        parts.append("<div class=\"message-actions\">")
+        parts.extend(actions)
+        parts.append("</div>")
+    parts.append("</header>")
     if body_parts:
-        body_html = f"<div class=\"message-body\">{''.join(body_parts)}</div>"
-    return f'<article class="{classes}"{entry_attr}>{header_html}{body_html}</article>'
+        parts.append("<div class=\"message-body\">")
+        parts.extend(body_parts)
+        parts.append("</div>")
+    parts.append("</article>")
+    return "".join(parts)
 
 
 def _render_tool_call(
@@ -1023,7 +1076,7 @@ def _render_tool_call(
 ) -> str:
     call_id = call.get("id") or ""
     name = escape(call.get("name") or "")
-    args = escape(json.dumps(call.get("arguments"), indent=2, default=str))
+    args = escape(_json_pretty(call.get("arguments")))
     return f"""
     <details>
       <summary>Tool Call · {name}</summary>
@@ -1032,6 +1085,18 @@ def _render_tool_call(
     """
 
 
+_REWARD_LABELS = {2: "Great", 1: "Good", 0: "Neutral", -1: "Poor", -2: "Bad"}
+# The button row for each possible current reward; None means unrated.
+_REWARD_BUTTONS: Dict[Optional[int], str] = {
+    current: "".join(
+        f"<button type='submit' name='reward' value='{value}' class='{'selected' if current == value else ''}'>"
+        f"{_REWARD_LABELS[value]}</button>"
+        for value in (-2, -1, 0, 1, 2)
+    )
+    for current in (None, -2, -1, 0, 1, 2)
+}
+
+
 def _render_reward_controls(
     conversation_id: str,
     target_id: Optional[str],
@@ -1040,15 +1105,7 @@ def _render_reward_controls(
 ) -> str:
     if not target_id:
         return ""
-    labels = {2: "Great", 1: "Good", 0: "Neutral", -1: "Poor", -2: "Bad"}
-    buttons = []
-    for value in [-2, -1, 0, 1, 2]:
-        label = labels[value]
-        classes = "selected" if current_value == value else ""
-        buttons.append(
-            f"<button type='submit' name='reward' value='{value}' class='{classes}'>{label}</button>"
-        )
-    buttons_html = "".join(buttons)
+    buttons_html = _REWARD_BUTTONS.get(current_value, _REWARD_BUTTONS[None])
     return f"""
     <form method="post" action="/conversation/{conversation_id}/label" class="label-actions">
       <input type="hidden" name="target_id" value="{escape(target_id)}" />
@@ -1065,7 +1122,7 @@ def render_prompt_form(
     if not conversation_id:
         return "<p class='placeholder'>Create a conversation to start chatting.</p>"
     agent_aliases = [agent.get("alias", "") for agent in agents if agent.get("alias")]
-    suggestions = escape(json.dumps(agent_aliases))
+    suggestions = escape(_json_compact(agent_aliases))
     return f"""
     <form method="post" action="/conversation/{conversation_id}/send" class="prompt">
       <div class="mention-helper" id="mention-helper" hidden></div>
@@ -1488,7 +1545,7 @@ def render_task_detail_page(task: TaskRecord) -> str:
         "description": task.description,
         "detail": task.detail,
     }
-    pretty = escape(json.dumps(payload, indent=2, default=str))
+    pretty = escape(_json_pretty(payload))
     title = escape(task.description or task.kind or task.id)
     return f"""<!DOCTYPE html>
 <html lang=\"en\">
@@ -194,6 +194,90 @@ def _random_text(length: int) -> str:
     return "".join(random.choice(alphabet) for _ in range(random.randint(0, length)))
 
 
+def test_dashboard_passes_fragments_through() -> None:
+    from app.templates import iter_dashboard
+
+    fragments = {
+        "history_html": "<ul id='history-fragment'></ul>",
+        "messages_html": "<article id='messages-fragment'></article>",
+        "tasks_html": "<div id='tasks-fragment'></div>",
+    }
+    chunks = list(
+        iter_dashboard(
+            **fragments,
+            active_conversation="abc123",
+            entry_ids=["e1", "e2"],
+            conversation_title="<Plans & notes>",
+            agents=[{"alias": "helper"}],
+            status={"worker_state": "ok", "worker_label": "Worker running"},
+            task_signature=[],
+        )
+    )
+    # Cached fragments are yielded as they are rather than copied into the page.
+    for fragment in fragments.values():
+        assert any(chunk is fragment for chunk in chunks)
+    page = "".join(chunks)
+    assert page.startswith("<!DOCTYPE html>")
+    assert page.rstrip().endswith("</html>")
+    assert "&lt;Plans &amp; notes&gt;" in page
+    assert "<Plans & notes>" not in page
+    assert "Worker running" in page
+
+
+def test_state_matches_dashboard(http_session: Tuple[requests.Session, str]) -> None:
+    session, base_url = http_session
+    base = base_url.rstrip("/")
+    resp = session.post(f"{base}/conversation/new", timeout=3)
+    final_url = resp.url if resp.history else resp.request.url
+    conversation_id = (parse_qs(urlparse(final_url).query).get("conversation") or [None])[0]
+    if not conversation_id:
+        conversation_id = session.get(f"{base}/state", timeout=3).json().get("active_conversation")
+    assert conversation_id
+
+    marker = f"render-check-{random.randint(0, 10**9)}"
+    resp = session.post(
+        f"{base}/conversation/{conversation_id}/send", data={"prompt": marker}, timeout=5
+    )
+    assert resp.status_code < 500
+
+    state_resp = session.get(f"{base}/state", params={"conversation": conversation_id}, timeout=3)
+    assert state_resp.status_code == 200
+    state = state_resp.json()
+    assert state["active_conversation"] == conversation_id
+    assert marker in state["messages_html"]
+    assert state["last_entry_id"] == state["entry_ids"][-1]
+
+    page = session.get(f"{base}/", params={"conversation": conversation_id}, timeout=3)
+    assert page.status_code == 200
+    assert marker in page.text
+    assert conversation_id in page.text
+
+    # An unchanged conversation is revalidated without a body. Queued tasks
+    # may still settle in the background, so allow a few polls for that.
+    for _ in range(40):
+        etag = state_resp.headers["ETag"]
+        state_resp = session.get(
+            f"{base}/state",
+            params={"conversation": conversation_id},
+            headers={"If-None-Match": f'W/"other", W/{etag}'},
+            timeout=3,
+        )
+        if state_resp.status_code == 304:
+            break
+        assert state_resp.status_code == 200
+        assert state_resp.headers["ETag"] != etag
+        time.sleep(0.25)
+    assert state_resp.status_code == 304
+    assert state_resp.headers["ETag"] == etag
+    assert not state_resp.content
+    assert session.get(
+        f"{base}/state",
+        params={"conversation": conversation_id},
+        headers={"If-None-Match": '"other"'},
+        timeout=3,
+    ).status_code == 200
+
+
 def test_ui_fuzz(http_session: Tuple[requests.Session, str]) -> None:
     random.seed(1)
     session, base_url = http_session
@@ -281,3 +365,52 @@ def test_ui_fuzz(http_session: Tuple[requests.Session, str]) -> None:
             aliases = refresh_aliases()
         else:
             raise AssertionError(f"Unknown action {action}")
+
+
+def test_llama_health_over_unix_socket(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    import asyncio
+    import json
+    import os
+    import socketserver
+    import tempfile
+    import threading
+    from http.server import BaseHTTPRequestHandler
+    from urllib.parse import quote
+
+    from app import main
+    from app.settings import SettingsManager
+
+    class HealthHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802 - http.server API
+            self.send_response(200 if self.path == "/health" else 404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args) -> None:
+            pass
+
+    class UnixHTTPServer(socketserver.UnixStreamServer):
+        def get_request(self):  # type: ignore[override]
+            request, _ = super().get_request()
+            return request, ("local", 0)
+
+    # AF_UNIX paths are short; pytest's tmp_path can exceed the limit.
+    socket_dir = tempfile.mkdtemp(prefix="webui-")
+    socket_path = os.path.join(socket_dir, "llama.sock")
+    server = UnixHTTPServer(socket_path, HealthHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        manager = SettingsManager(tmp_path / "settings.json")
+        manager.save(
+            {"llama_cpp": {"base_url": f"http+unix://{quote(socket_path, safe='')}/v1/chat/completions"}}
+        )
+        monkeypatch.setattr(main, "settings_manager", manager)
+        monkeypatch.setattr(main, "_health_url_cache", None)
+        response = asyncio.run(main.llama_health())
+        assert json.loads(response.body)["status"] == "ok"
+    finally:
+        server.shutdown()
+        server.server_close()
+        os.unlink(socket_path)
+        os.rmdir(socket_dir)
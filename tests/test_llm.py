@@ -0,0 +1,82 @@
+from pathlib import Path
+import sys
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app import llm  # noqa: E402
+from app.llm import unpack_assistant_message  # noqa: E402
+
+
+def test_unpack_strips_chain_of_thought_tags() -> None:
+    text, reasoning, reasoning_content = unpack_assistant_message(
+        {"content": "<think>step one</think>Answer with <b>markup</b>"}
+    )
+    assert text == "Answer with <b>markup</b>"
+    assert reasoning == ["step one"]
+    assert reasoning_content == []
+
+
+def test_unpack_matches_tags_case_insensitively() -> None:
+    text, reasoning, _ = unpack_assistant_message(
+        {
+            "content": [
+                {"type": "text", "text": "<Reasoning>draft</REASONING> done"},
+                {"type": "analysis", "text": "checked"},
+            ]
+        }
+    )
+    assert text == "done"
+    assert reasoning == ["draft", "checked"]
+
+
+def test_unpack_keeps_unterminated_tags() -> None:
+    text, reasoning, _ = unpack_assistant_message({"content": "<think>never closed"})
+    assert text == "<think>never closed"
+    assert reasoning == []
+
+
+_FIELD_SOURCES = [
+    "Name: Ada\nRole: engineer",
+    "name: first\r\nNAME: second",
+    "intro\rStatus: ok\x85Other: no",
+    "a\x0bStatus:  spaced   Status: later",
+    "Status without colon\n",
+    "\n\nstatus:",
+    "nothing here",
+    "",
+]
+
+
+@pytest.mark.parametrize("source", _FIELD_SOURCES)
+@pytest.mark.parametrize("field", ["name", "Status", "role", "other"])
+def test_find_field_matches_splitlines(source: str, field: str) -> None:
+    expected = None
+    for line in source.splitlines():
+        if line.lower().startswith(field.lower()):
+            expected = line.split(":", 1)[-1].strip()
+            break
+    assert llm._py_find_field(source, field) == expected
+
+
+_CHAIN_SOURCES = [
+    "<think>step one</think>Answer",
+    "<THINK>a</think> b <reasoning> c </Reasoning><thought></thought>",
+    "<think>never closed",
+    "x < y and <b>markup</b>",
+    "<think><think>nested</think></think>",
+    "",
+]
+
+
+@pytest.mark.parametrize("source", _CHAIN_SOURCES)
+def test_compiled_scanners_match_python(source: str) -> None:
+    fast = pytest.importorskip("app._fast")
+    assert fast.scan_chain(source) == llm._py_scan_chain(source)
+    for field in ("name", "status", "<think>"):
+        assert fast.find_field(source, field) == llm._py_find_field(source, field)
+    for field_source in _FIELD_SOURCES:
+        assert fast.find_field(field_source, "status") == llm._py_find_field(field_source, "status")
@@ -0,0 +1,211 @@
+import os
+from pathlib import Path
+import sys
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app import storage  # noqa: E402
+from app.storage import ConversationStore, IndexStore  # noqa: E402
+
+
+def _new_conversation(store: ConversationStore) -> str:
+    return store.create_conversation(
+        agent="assistant",
+        system_prompt="You are helpful.",
+        model="test-model",
+        temperature=0.2,
+        context_size=2048,
+    )
+
+
+def test_jsonl_lines_read_back_unchanged(tmp_path: Path) -> None:
+    for payload in ({"text": "lone \ud800 surrogate"}, {"counts": {1: "one"}}, {"big": 2**64 - 1}):
+        assert storage._loads(storage._dumps(payload)) == storage.json.loads(
+            storage.json.dumps(payload)
+        )
+    with pytest.raises(TypeError):
+        storage._dumps({"content": [2**70]})
+
+    # Files written by json.dumps before orjson was used may contain NaN.
+    store = ConversationStore(tmp_path)
+    conversation_id = _new_conversation(store)
+    with store._conversation_path(conversation_id).open("ab") as handle:
+        handle.write(b'{"id": "legacy", "type": "message", "content": NaN, "tags": []}\n')
+    legacy = [entry for entry in store.load_conversation(conversation_id) if entry["id"] == "legacy"]
+    assert len(legacy) == 1 and legacy[0]["content"] != legacy[0]["content"]
+    store.close()
+
+
+def test_store_works_without_fcntl(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(storage, "fcntl", None)
+    store = ConversationStore(tmp_path)
+    conversation_id = _new_conversation(store)
+    with store.batch(conversation_id):
+        store.append_user_message(conversation_id, "one")
+    store.append_user_message(conversation_id, "two")
+    assert [entry.get("content") for entry in store.load_conversation(conversation_id)[1:]] == [
+        "one",
+        "two",
+    ]
+    store.close()
+
+
+def test_record_access_keeps_the_merged_index_current(tmp_path: Path) -> None:
+    store = IndexStore(tmp_path)
+    store.record_summary("c1", summary="first", title="First")
+    latest = store.latest_index()
+    record = store.record_access("c1", latest)
+    assert store.version == (store.path.stat().st_ino, store.path.stat().st_size)
+    assert store._latest["c1"]["kind"] == "access"
+    assert store._latest["c1"]["title"] == "First"
+
+    # A second open within the minute writes nothing and returns the caller's record.
+    size = store.path.stat().st_size
+    assert store.record_access("c1", latest) is record
+    assert store.path.stat().st_size == size
+    assert store.latest_index() == latest
+
+
+def test_listing_reflects_appends_from_another_store(tmp_path: Path) -> None:
+    web, worker = ConversationStore(tmp_path), ConversationStore(tmp_path)
+    older, newer = _new_conversation(web), _new_conversation(web)
+    os.utime(web._conversation_path(older), ns=(1_000_000_000, 1_000_000_000))
+    assert [meta.conversation_id for meta in web.list_conversations()] == [newer, older]
+    version = web.listing_version
+    assert [meta.conversation_id for meta in web.list_conversations()] == [newer, older]
+    assert web.listing_version == version
+
+    worker.append_user_message(older, "reply")
+    listing = web.list_conversations()
+    assert [meta.conversation_id for meta in listing] == [older, newer]
+    assert listing[0].last_modified.year > 2001
+    assert web.listing_version == version + 1
+    web.close()
+    worker.close()
+
+
+def test_last_message_timestamp_follows_display_order(tmp_path: Path) -> None:
+    web, worker = ConversationStore(tmp_path), ConversationStore(tmp_path)
+    conversation_id = _new_conversation(web)
+    assert web.last_message_timestamp(conversation_id) is None
+    # The worker's reply is written last but ordered before the web process's
+    # later message, as happens when the two interleave.
+    earlier = web.new_ordering(conversation_id, "send")
+    later = web.new_ordering(conversation_id, "send")
+    web.append_entry(
+        conversation_id,
+        {"type": "message", "role": "user", "ordering": later, "timestamp": "2024-05-02T10:00:00.000002Z"},
+    )
+    worker.append_entry(
+        conversation_id,
+        {"type": "message", "role": "assistant", "ordering": earlier, "timestamp": "2024-05-02T10:00:00.000001Z"},
+    )
+    worker.append_tag(conversation_id, "missing", ["note"])
+    assert web.last_message_timestamp(conversation_id) == storage.datetime(2024, 5, 2, 10, 0, 0, 2)
+    assert web.last_message_timestamp("missing") is None
+    web.close()
+    worker.close()
+
+
+def test_parse_timestamp_matches_strptime() -> None:
+    for timestamp in ("2024-05-02T10:00:00.000001Z", "2024-12-31T23:59:59.999999Z"):
+        assert storage._parse_timestamp(timestamp) == storage.datetime.strptime(
+            timestamp, storage.ISO_FORMAT
+        )
+
+
+def test_load_conversation_picks_up_appends_from_another_store(tmp_path: Path) -> None:
+    web = ConversationStore(tmp_path)
+    worker = ConversationStore(tmp_path)
+    conversation_id = _new_conversation(web)
+    first = web.append_user_message(conversation_id, "hello")
+    assert [entry.get("content") for entry in web.load_conversation(conversation_id)][-1] == "hello"
+
+    # The worker process appends through its own store; the web store's cache
+    # must fold in the new tail, including tags aimed at earlier entries.
+    worker.append_entry(
+        conversation_id,
+        {"role": "assistant", "type": "message", "content": "hi there", "tags": ["b", "a", "b"]},
+    )
+    worker.append_tag(conversation_id, first, ["needs-review"])
+    entries = web.load_conversation(conversation_id)
+    assert [entry["type"] for entry in entries] == ["metadata", "message", "message"]
+    assert entries[1]["tags"] == ["needs-review"]
+    assert entries[2]["tags"] == ["a", "b"]
+
+    # Returned entries are copies; editing them leaves the cache intact.
+    entries[1]["content"] = "changed"
+    assert web.load_conversation(conversation_id)[1]["content"] == "hello"
+    web.close()
+    worker.close()
+
+
+def test_tag_for_unread_entry_applies_once_it_arrives(tmp_path: Path) -> None:
+    store = ConversationStore(tmp_path)
+    conversation_id = _new_conversation(store)
+    store.append_tag(conversation_id, "later", ["early"])
+    store.load_conversation(conversation_id)
+    store.append_entry(
+        conversation_id,
+        {"id": "later", "role": "user", "type": "message", "content": "x", "tags": ["own"]},
+    )
+    entries = store.load_conversation(conversation_id)
+    assert [entry["tags"] for entry in entries if entry.get("id") == "later"] == [["early", "own"]]
+    store.close()
+
+
+def test_rotation_keeps_every_entry_in_order(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(storage, "SEGMENT_BYTES", 2048)
+    store = ConversationStore(tmp_path)
+    conversation_id = _new_conversation(store)
+    contents = [f"message {index} " + "x" * 200 for index in range(40)]
+    for index, content in enumerate(contents):
+        store.append_user_message(conversation_id, content)
+        if index % 7 == 0:
+            # Interleave reads so the cache has to follow each rotation.
+            store.load_conversation(conversation_id)
+    assert store._segment_path(conversation_id, 2).exists()
+    assert store._conversation_path(conversation_id).stat().st_size < 2048
+
+    loaded = [entry["content"] for entry in store.load_conversation(conversation_id)[1:]]
+    assert loaded == contents
+    # A fresh store reads the compressed segments back in the same order.
+    reader = ConversationStore(tmp_path)
+    assert [entry["content"] for entry in reader.load_conversation(conversation_id)[1:]] == contents
+    store.close()
+
+
+def test_batch_entries_become_visible_on_exit(tmp_path: Path) -> None:
+    store = ConversationStore(tmp_path)
+    reader = ConversationStore(tmp_path)
+    conversation_id = _new_conversation(store)
+    with store.batch(conversation_id):
+        store.append_user_message(conversation_id, "one")
+        store.append_user_message(conversation_id, "two")
+        assert len(reader.load_conversation(conversation_id)) == 1
+    assert [entry.get("content") for entry in reader.load_conversation(conversation_id)[1:]] == [
+        "one",
+        "two",
+    ]
+    store.close()
+
+
+def test_index_merges_incrementally_and_survives_prune(tmp_path: Path) -> None:
+    index = IndexStore(tmp_path, max_lines=8)
+    index.record_summary("a", "first summary", "First")
+    assert index.latest_index()["a"]["title"] == "First"
+    version = index.version
+
+    for _ in range(10):
+        index.record_summary("b", "second summary", "Second")
+    latest = index.latest_index()
+    assert index.version != version
+    assert latest["a"]["title"] == "First"
+    assert latest["b"]["title"] == "Second"
+    # Pruning rewrote the file; a new reader sees the same merged records.
+    assert len(index.path.read_bytes().splitlines()) <= 8
+    assert IndexStore(tmp_path).latest_index() == latest
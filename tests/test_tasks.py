@@ -0,0 +1,86 @@
+import logging
+import multiprocessing as mp
+from pathlib import Path
+import sys
+import time
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app import tasks  # noqa: E402
+from app.tasks import (  # noqa: E402
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    TaskService,
+    _encode_frame,
+    _EventOutbox,
+    _loads,
+    _next_task,
+)
+
+
+def test_next_task_pops_by_priority_then_order() -> None:
+    reader, writer = mp.Pipe(duplex=False)
+    frames = [
+        (PRIORITY_LOW, 1, {"task_id": "summary"}),
+        (PRIORITY_NORMAL, 2, {"task_id": "reply-1"}),
+        (PRIORITY_HIGH, 3, {"task_id": "shutdown"}),
+        (PRIORITY_NORMAL, 4, {"task_id": "reply-2"}),
+    ]
+    for frame in frames:
+        writer.send_bytes(_encode_frame(frame))
+    pending: list = []
+    order = [_next_task(reader, pending)[2]["task_id"] for _ in frames]
+    assert order == ["shutdown", "reply-1", "reply-2", "summary"]
+    reader.close()
+    writer.close()
+
+
+def test_enqueue_does_not_block_while_the_worker_is_busy(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    caplog.set_level(logging.INFO, logger=tasks.logger.name)
+    service = TaskService(tmp_path, tmp_path / "settings.json")
+    # No worker is started, so nothing reads the task pipe.
+    monkeypatch.setattr(service, "start", lambda: None)
+    started = time.monotonic()
+    task_ids = [service.enqueue_summary(f"conversation-{index}") for index in range(3000)]
+    assert time.monotonic() - started < 5
+    assert len(service.snapshot()) == 3000
+
+    # Every frame still arrives intact and in order once the worker reads.
+    received = []
+    while len(received) < len(task_ids):
+        assert service._task_reader.poll(5)
+        priority, order, payload = _loads(service._task_reader.recv_bytes())
+        assert priority == PRIORITY_LOW
+        received.append((order, payload["task_id"]))
+    assert [task_id for _, task_id in received] == task_ids
+    assert [order for order, _ in received] == sorted(order for order, _ in received)
+    service._outgoing.put(None)
+
+
+def test_event_outbox_collapses_events_while_the_pipe_is_full() -> None:
+    reader, writer = mp.Pipe(duplex=False)
+    outbox = _EventOutbox(writer)
+    # Far more than the pipe holds, so the writer thread blocks on it; posting
+    # never does.
+    for index in range(2000):
+        outbox.post({"task_id": f"filler-{index}", "message": "x" * 100})
+    for status in ("queued", "running", "completed"):
+        outbox.post({"task_id": "task-1", "status": status})
+    assert outbox
+
+    events = []
+    while not events or events[-1]["task_id"] != "task-1":
+        assert reader.poll(5)
+        events.append(_loads(reader.recv_bytes()))
+    assert [event["status"] for event in events if event["task_id"] == "task-1"] == ["completed"]
+    assert len(events) == 2001
+    outbox.close(timeout=5)
+    reader.close()
+    writer.close()